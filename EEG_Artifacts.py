@@ -0,0 +1,266 @@
+"""
+Adaptive artifact detection, selectable with EEGProcessor(artifact_method="adaptive").
+
+The fixed screening (artifact_method="fixed", see EEGProcessor.screen_artifacts) compares every
+30s window and channel to absolute thresholds in Volts, which depend on the headset, the gain
+and the electrode contact. ArtifactDetector instead judges every channel against its own running
+statistics, at a sub-window resolution:
+
+    - The signal (bandpassed and average referenced) is cut into segments of segment_sec seconds.
+      Per segment and channel three features are taken, on a log10 scale: peak-to-peak
+      amplitude, standard deviation, and standard deviation of the first difference (the high
+      frequency content that muscle activity raises).
+    - Each feature keeps a running median and MAD per channel (RunningMedianMAD). A segment is
+      flagged when its robust z-score, (x - median) / (1.4826 * MAD), passes z_threshold:
+      high amplitude on the peak-to-peak, flatline below it on the std, EMG on the difference
+      std, with the same priority as the fixed screening. Being relative on a log scale, the
+      decisions don't depend on the units or the gain of the recording.
+    - Blinks are detected without an EOG channel: the frontal channels minus the posterior mean
+      act as a virtual vertical EOG. After a 100 ms moving average (which removes alpha and
+      muscle activity) a segment holds a blink when the positive peak of that signal is more than
+      blink_ratio times the usual standard deviation of the frontal channels (their running
+      median, so it doesn't matter how often the subject blinks), the frontal channels agree on
+      its sign and it lasts like a blink (50-600 ms at half height). The frontal channels of the
+      segment are then marked "blink" and the peak time is kept.
+
+Everything is causal and incremental: push() takes the samples as they come, whatever the
+chunking, and the state is the statistics plus less than one segment of samples, so memory is
+O(1) per channel (plus the per segment output, which can be bounded with keep_segments for live
+use). Each segment is judged against the statistics of the segments before it, and the
+statistics then follow the signal, so they adapt to slow changes of the recording. The first
+warmup_segments segments seed the statistics (exact median and MAD) and are judged once the
+warm-up is over, which is why a segment's codes can come out a few segments after its samples.
+"""
+from collections import deque
+
+import numpy as np
+
+# Per-channel rejection reason codes (0 means the channel is clean)
+ARTIFACT_REASONS = {1: "high_amplitude", 2: "flatline", 3: "emg", 4: "blink"}
+ARTIFACT_METHODS = ("fixed", "adaptive")
+HIGH_AMPLITUDE, FLATLINE, EMG, BLINK = 1, 2, 3, 4
+# log10 of the features of a constant signal (zero std)
+LOG_FLOOR = -30.0
+
+
+class RunningMedianMAD:
+    """
+    Running median and MAD of an array of values (e.g. one per channel and feature), updated one
+    observation of the whole array at a time, in O(1) memory per value.
+
+    The first warmup observations are kept and give the exact median and MAD. After that both
+    are tracked with the frugal streaming quantile update (Ma et al., 2013): the median moves by
+    a fixed step towards each new value, and the MAD towards each new absolute deviation, so
+    each settles where half the observations fall on either side. The step is rate times the
+    current MAD, which makes it scale free and lets the estimates follow slow drifts.
+    """
+
+    def __init__(self, shape, warmup=20, rate=0.02, mad_floor=0.01):
+        self.warmup = warmup
+        self.rate = rate
+        self.mad_floor = mad_floor
+        self.median = np.zeros(shape)
+        self.mad = np.zeros(shape)
+        self.count = 0
+        self._warm = []
+
+    @property
+    def ready(self):
+        return self.count >= self.warmup
+
+    def zscore(self, x):
+        """Robust z-score of x against the current statistics."""
+        return (x - self.median) / (1.4826 * np.maximum(self.mad, self.mad_floor))
+
+    def update(self, x):
+        """Folds in one observation. Returns the warm-up observations when this one completes the warm-up."""
+        self.count += 1
+        if self.count <= self.warmup:
+            self._warm.append(np.array(x, dtype=np.float64))
+            if self.count == self.warmup:
+                return self._seed()
+            return None
+        step = self.rate * np.maximum(self.mad, self.mad_floor)
+        self.median += step * np.sign(x - self.median)
+        self.mad += step * np.sign(np.abs(x - self.median) - self.mad)
+        np.maximum(self.mad, 0, out=self.mad)
+        return None
+
+    def finish_warmup(self):
+        """Seeds the statistics from the observations so far if the warm-up was cut short (end of the data)."""
+        return self._seed() if self._warm and not self.ready else None
+
+    def _seed(self):
+        warm = np.stack(self._warm)
+        self.median = np.asarray(np.median(warm, axis=0))
+        self.mad = np.asarray(np.median(np.abs(warm - self.median), axis=0))
+        self.count = max(self.count, self.warmup)
+        self._warm = []
+        return warm
+
+
+class ArtifactDetector:
+    """
+    Incremental per segment artifact detection on bandpassed, average referenced samples, see the
+    module docstring. frontal and posterior are channel indices (blink detection is off without
+    frontal channels). codes and blinks keep the results of every final segment, or of the last
+    keep_segments ones.
+    """
+
+    def __init__(self, sfreq, n_channels, frontal=(), posterior=(), segment_sec=1.0, z_threshold=5.0,
+                 flat_z_threshold=3.0, blink_ratio=5.0, warmup_segments=20, rate=0.02, keep_segments=None):
+        self.sfreq = sfreq
+        self.seg = int(round(segment_sec * sfreq))
+        self.n_channels = n_channels
+        self.frontal = np.asarray(frontal, dtype=int)
+        self.posterior = np.asarray(posterior, dtype=int)
+        self.z_threshold = z_threshold
+        self.flat_z_threshold = flat_z_threshold
+        self.blink_log_ratio = np.log10(blink_ratio)
+        self.stats = RunningMedianMAD((n_channels, 3), warmup_segments, rate)
+        # Reason codes (n_channels,) of every final segment, and the sample index of every blink peak
+        self.codes = deque(maxlen=keep_segments)
+        self.blinks = deque(maxlen=keep_segments)
+        self.n_segments = 0     # Final segments
+        self._n_seen = 0        # Segments whose features were taken (final or warming up)
+        self._pending = np.empty((n_channels, 0))
+        self._smooth = max(1, int(round(0.1 * sfreq)))
+        self._smooth_tail = np.zeros((len(self.frontal), self._smooth - 1))
+        self._warm_blinks = []
+        self._last_blink = None  # (peak, log amplitude) of the last blink, to merge the halves of a split blink
+
+    def push(self, samples):
+        """Feeds (n_channels, n_times) samples; returns the number of segments that became final."""
+        samples = np.concatenate([self._pending, np.asarray(samples, dtype=np.float64)], axis=1)
+        n_seg = samples.shape[1] // self.seg
+        self._pending = samples[:, n_seg * self.seg:]
+        if n_seg == 0:
+            return 0
+        segments = samples[:, :n_seg * self.seg].reshape(self.n_channels, n_seg, self.seg)
+        features = self._features(segments)
+        blink_amp, blink_peak, blink_shape = self._blink_candidates(samples[:, :n_seg * self.seg], n_seg)
+        done = self.n_segments
+        for i in range(n_seg):
+            self._judge(features[i], blink_amp[i], self._n_seen * self.seg + int(blink_peak[i]), blink_shape[i])
+            self._n_seen += 1
+        return self.n_segments - done
+
+    def flush(self):
+        """Ends the stream: a warm-up cut short by the end of the data is seeded from what was seen and judged."""
+        done = self.n_segments
+        warm = self.stats.finish_warmup()
+        if warm is not None:
+            self._emit_warmup(warm)
+        return self.n_segments - done
+
+    def segment_codes(self, start, stop):
+        """
+        Reason codes (n, n_channels) of the final segments that mostly fall in samples [start, stop),
+        and the blink peaks (sample indices) in that range. Segments that are not final yet are left out.
+        """
+        first = max(int(round(start / self.seg)), self.n_segments - len(self.codes))
+        last = min(int(round(stop / self.seg)), self.n_segments)
+        offset = self.n_segments - len(self.codes)
+        codes = np.array([self.codes[i - offset] for i in range(first, last)], dtype=np.int8).reshape(-1, self.n_channels)
+        return codes, [b for b in self.blinks if start <= b < stop]
+
+    def _features(self, segments):
+        """(n_seg, n_channels, 3) log10 peak-to-peak, std and first difference std."""
+        ptp = segments.max(axis=-1) - segments.min(axis=-1)
+        std = segments.std(axis=-1)
+        diff_std = np.diff(segments, axis=-1).std(axis=-1)
+        features = np.stack([ptp, std, diff_std], axis=-1).transpose(1, 0, 2)
+        with np.errstate(divide='ignore'):
+            return np.maximum(np.log10(features), LOG_FLOOR)
+
+    def _blink_candidates(self, samples, n_seg):
+        """
+        Per segment: log10 of the largest absolute value of the smoothed virtual EOG, the offset of that
+        peak in the segment, and whether its sign, the frontal sign agreement and the width look like a blink.
+        """
+        amp = np.full(n_seg, LOG_FLOOR)
+        peak = np.zeros(n_seg, dtype=int)
+        shape_ok = np.zeros(n_seg, dtype=bool)
+        if len(self.frontal) == 0:
+            return amp, peak, shape_ok
+        veog = samples[self.frontal]
+        if len(self.posterior):
+            veog = veog - samples[self.posterior].mean(axis=0)
+        # Moving average over the last 100 ms, carried over from the previous push
+        padded = np.concatenate([self._smooth_tail, veog], axis=1)
+        cumsum = np.cumsum(np.pad(padded, ((0, 0), (1, 0))), axis=1)
+        smoothed = (cumsum[:, self._smooth:] - cumsum[:, :-self._smooth]) / self._smooth
+        self._smooth_tail = padded[:, padded.shape[1] - (self._smooth - 1):]
+        per_channel = smoothed.reshape(len(self.frontal), n_seg, self.seg)
+        veog = per_channel.mean(axis=0)
+
+        peak = np.argmax(np.abs(veog), axis=1)
+        height = veog[np.arange(n_seg), peak]
+        with np.errstate(divide='ignore'):
+            amp = np.maximum(np.log10(np.abs(height)), LOG_FLOOR)
+        # Blinks are positive on the frontal channels
+        agree = (per_channel[:, np.arange(n_seg), peak] > 0).mean(axis=0) >= 0.75
+        width = (veog > height[:, np.newaxis] / 2).sum(axis=1) / self.sfreq
+        shape_ok = (height > 0) & agree & (width >= 0.05) & (width <= 0.6)
+        # The moving average delays the signal by half its length
+        peak = np.maximum(peak - (self._smooth - 1) // 2, 0)
+        return amp, peak, shape_ok
+
+    def _judge(self, features, blink_amp, blink_peak, blink_shape):
+        """Judges one segment against the statistics so far (or holds it during the warm-up), then updates them."""
+        if not self.stats.ready:
+            self._warm_blinks.append((blink_amp, blink_peak, blink_shape))
+            warm = self.stats.update(features)
+            if warm is not None:
+                self._emit_warmup(warm)
+            return
+        self._emit(self._codes(features, blink_amp, blink_shape), blink_peak, blink_amp)
+        self.stats.update(features)
+
+    def _emit_warmup(self, warm):
+        for features, (blink_amp, blink_peak, blink_shape) in zip(warm, self._warm_blinks):
+            self._emit(self._codes(features, blink_amp, blink_shape), blink_peak, blink_amp)
+        self._warm_blinks = []
+
+    def _codes(self, features, blink_amp, blink_shape):
+        z = self.stats.zscore(features)
+        thr = self.z_threshold
+        emg = z[:, 2] > thr
+        # Muscle activity raises the amplitude too, it is told apart by raising the high frequencies more
+        high_amp = (z[:, 0] > thr) & ~(emg & (z[:, 2] >= z[:, 0]))
+        flat = ~high_amp & (z[:, 1] < -self.flat_z_threshold)
+        codes = np.zeros(self.n_channels, dtype=np.int8)
+        codes[emg & ~high_amp & ~flat] = EMG
+        codes[flat] = FLATLINE
+        codes[high_amp] = HIGH_AMPLITUDE
+        # A blink towers over the usual activity of the frontal channels (their running median std); being
+        # relative to the median, this holds however often the subject blinks
+        if blink_shape and blink_amp - self.stats.median[self.frontal, 1].mean() > self.blink_log_ratio:
+            codes[self.frontal] = BLINK
+        return codes
+
+    def _emit(self, codes, blink_peak, blink_amp):
+        self.codes.append(codes)
+        if (codes == BLINK).any():
+            # A blink across a segment boundary shows in both segments: one blink, at the higher peak
+            last = self._last_blink
+            if last is not None and blink_peak - last[0] < 0.3 * self.sfreq:
+                if blink_amp > last[1]:
+                    self.blinks[-1] = blink_peak
+                    self._last_blink = (blink_peak, blink_amp)
+            else:
+                self.blinks.append(blink_peak)
+                self._last_blink = (blink_peak, blink_amp)
+        self.n_segments += 1
+
+
+def window_artifacts(codes, channel_threshold_pct=0.3, max_bad_fraction=0.25):
+    """
+    Whether a window is noisy from the reason codes (n_segments, n_channels) of its segments: a
+    segment is bad when it holds a blink or more than channel_threshold_pct of its channels are
+    flagged, and the window is noisy when more than max_bad_fraction of its segments are bad.
+    Returns (noisy, bad segment mask).
+    """
+    n_channels = codes.shape[1]
+    bad = ((codes > 0).sum(axis=1) > int(n_channels * channel_threshold_pct)) | (codes == BLINK).any(axis=1)
+    return bool(len(bad) and bad.mean() > max_bad_fraction), bad
@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS baseline_subjects (
+    subject_id TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS baseline_metrics (
+    subject_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    mean REAL NOT NULL,
+    m2 REAL NOT NULL,
+    PRIMARY KEY (subject_id, metric)
+);
+"""
+
+# Chan et al.'s pairwise form of Welford's update: merges the session's (n, mean, M2) into the stored ones
+MERGE = """
+INSERT INTO baseline_metrics (subject_id, metric, n, mean, m2) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (subject_id, metric) DO UPDATE SET
+    mean = mean + (excluded.mean - mean) * excluded.n / (n + excluded.n),
+    m2 = m2 + excluded.m2 + (excluded.mean - mean) * (excluded.mean - mean) * n * excluded.n / (n + excluded.n),
+    n = n + excluded.n
+"""
+
+
+class BaselineStore:
+    """
+    Per subject running statistics of the window metrics (band powers and indices), in a SQLite file,
+    so a session can be normalized against everything recorded from the same subject before.
+
+    Each metric keeps its count, mean and sum of squared deviations (M2). A session is folded in
+    with one add_session call: its clean windows are summarised with NumPy and merged into the
+    stored values with the pairwise Welford update, one UPSERT per metric, so the cost doesn't
+    grow with the number of past sessions and no recording is ever reprocessed.
+    Only the path is kept, a connection is opened per call, so the store can be handed to worker
+    processes and several processes can update it at once (SQLite serialises the writes).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        """Store at EEG_BASELINE_DB, None (per subject baselines disabled) when unset."""
+        path = os.environ.get("EEG_BASELINE_DB")
+        return cls(path) if path else None
+
+    @contextmanager
+    def _connect(self):
+        """Connection committed on success (rolled back on error) and always closed."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, subject_id):
+        """
+        {"subject_id", "sessions", "updated_at", "metrics": {metric: {"n", "mean", "var"}}} of a subject,
+        None if nothing was stored for it. var is the sample variance (None below two windows).
+        """
+        with self._connect() as db:
+            subject = db.execute("SELECT sessions, updated_at FROM baseline_subjects WHERE subject_id = ?",
+                                 (subject_id,)).fetchone()
+            if subject is None:
+                return None
+            rows = db.execute("SELECT metric, n, mean, m2 FROM baseline_metrics WHERE subject_id = ?",
+                              (subject_id,)).fetchall()
+        return {
+            "subject_id": subject_id,
+            "sessions": subject[0],
+            "updated_at": subject[1],
+            "metrics": {metric: {"n": n, "mean": mean, "var": m2 / (n - 1) if n > 1 else None}
+                        for metric, n, mean, m2 in rows}
+        }
+
+    def add_session(self, subject_id, metrics, values):
+        """
+        Folds a session into the subject's statistics. values is a (n_windows, n_metrics) array with
+        the metrics in the given order; a session without any window is not stored.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        n = len(values)
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        with self._connect() as db:
+            db.executemany(MERGE, [(subject_id, metric, n, float(mean[i]), float(m2[i]))
+                                   for i, metric in enumerate(metrics)])
+            db.execute("INSERT INTO baseline_subjects (subject_id, sessions, updated_at) VALUES (?, 1, ?) "
+                       "ON CONFLICT (subject_id) DO UPDATE SET sessions = sessions + 1, "
+                       "updated_at = excluded.updated_at", (subject_id, time.time()))
+
+    def delete(self, subject_id):
+        """Forgets a subject; returns whether it existed."""
+        with self._connect() as db:
+            db.execute("DELETE FROM baseline_metrics WHERE subject_id = ?", (subject_id,))
+            return db.execute("DELETE FROM baseline_subjects WHERE subject_id = ?", (subject_id,)).rowcount > 0
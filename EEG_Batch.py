@@ -0,0 +1,174 @@
+"""
+Offline batch runner: processes whole directories (or globs) of recordings in parallel
+without going through the API.
+
+    python EEG_Batch.py data/albasri/ --out results/ --workers 8
+    python EEG_Batch.py "data/**/*.csv" --out results/ --parquet --low-memory
+
+For every input a <name>.json with the usual result dict is written to --out (and a
+<name>.windows.parquet per-window table with --parquet), then a cohort_summary.csv with one
+row per file. Files whose JSON output already exists are skipped, so an interrupted run can
+simply be restarted.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from EEG_Artifacts import ARTIFACT_METHODS
+from EEG_Filters import FILTER_METHODS
+from EEG_Processor import EEGProcessor, SCORE_KEYS, SPATIAL_LEVELS, STATE_LABELS
+from EEG_Readers import READERS
+from EEG_Spectral import PSD_METHODS
+
+
+def find_inputs(patterns):
+    """Expands directories (recursively, supported extensions only) and globs into a sorted file list."""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                files.update(os.path.join(root, n) for n in names if os.path.splitext(n)[1].lower() in READERS)
+        else:
+            files.update(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+    return sorted(files)
+
+
+def output_name(file_path, base_dirs):
+    """Output stem: path relative to its input directory with separators flattened, so names don't collide."""
+    abs_path = os.path.abspath(file_path)
+    for base in base_dirs:
+        if abs_path.startswith(base + os.sep):
+            abs_path = abs_path[len(base) + 1:]
+            break
+    else:
+        abs_path = os.path.basename(abs_path)
+    return os.path.splitext(abs_path)[0].replace(os.sep, "__")
+
+
+def run_one(file_path, processor_kwargs, low_memory):
+    """Runs in a worker process; returns the result and the processing time."""
+    t0 = time.perf_counter()
+    processor = EEGProcessor(**processor_kwargs, low_memory=low_memory)
+    # The streaming path holds only a few windows; overlapping windows and the IIR filter need the whole
+    # recording, which the low memory mode keeps as a single in place buffer
+    streaming = low_memory and processor.hop == processor.window_size and processor.filter_method != "iir"
+    result = processor.process_streaming(file_path) if streaming else processor.process_file(file_path)
+    return result, time.perf_counter() - t0
+
+
+def write_outputs(result, out_dir, name, parquet):
+    if parquet:
+        windows = pd.DataFrame(result["scores"], columns=SCORE_KEYS)
+        windows.insert(0, "state", result["timeline"])
+        windows.insert(0, "start_sec", windows.index * result["metadata"]["hop_sec"])
+        windows.to_parquet(os.path.join(out_dir, f"{name}.windows.parquet"), index=False)
+    # The JSON goes last: its presence marks the file as done
+    tmp_path = os.path.join(out_dir, f"{name}.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(result, f, default=float)
+    os.replace(tmp_path, os.path.join(out_dir, f"{name}.json"))
+
+
+def summary_row(file_path, result):
+    row = {
+        "file": file_path,
+        "windows": result["metadata"]["windows"],
+        "quality_warning": result["metadata"]["quality_warning"]
+    }
+    for state in STATE_LABELS.tolist():
+        row[f"pct_{state}"] = result["session_profile"].get(state, 0.0)
+    scores = pd.DataFrame(result["scores"], columns=SCORE_KEYS)
+    for key in SCORE_KEYS:
+        row[f"mean_{key}"] = scores[key].mean()
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="Directories and/or glob patterns")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--sfreq", type=float, default=250)
+    parser.add_argument("--window-size", type=float, default=30)
+    parser.add_argument("--hop", type=float, default=None, help="Seconds between window starts (default: window size)")
+    parser.add_argument("--filter-method", choices=FILTER_METHODS, default="fir", help="Bandpass implementation")
+    parser.add_argument("--filter-jobs", type=int, default=1, help="Threads per worker for the bandpass filter and the PSDs")
+    parser.add_argument("--psd-method", choices=PSD_METHODS, default="mne", help="Window PSD estimator")
+    parser.add_argument("--artifact-method", choices=ARTIFACT_METHODS, default="fixed",
+                        help="Artifact screening (fixed thresholds, or adaptive per channel statistics with blinks)")
+    parser.add_argument("--spatial", nargs="+", choices=SPATIAL_LEVELS, default=[],
+                        help="Per region / per channel features to add to the JSON results")
+    parser.add_argument("--parquet", action="store_true", help="Also write a per-window Parquet table per file")
+    parser.add_argument("--low-memory", action="store_true", help="Bound the memory of each worker (streaming path, or the in place "
+                        "low memory mode with --hop / the iir filter)")
+    parser.add_argument("--overwrite", action="store_true", help="Reprocess files whose output already exists")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    files = find_inputs(args.inputs)
+    base_dirs = [os.path.abspath(p) for p in args.inputs if os.path.isdir(p)]
+    # Files matched by globs are named relative to their common parent directory
+    glob_dirs = [os.path.dirname(os.path.abspath(f)) for f in files
+                 if not any(os.path.abspath(f).startswith(b + os.sep) for b in base_dirs)]
+    if glob_dirs:
+        base_dirs.append(os.path.commonpath(glob_dirs))
+    names = {f: output_name(f, base_dirs) for f in files}
+    todo = [f for f in files if args.overwrite or not os.path.exists(os.path.join(args.out, f"{names[f]}.json"))]
+    print(f"{len(files)} files found, {len(files) - len(todo)} already done, {len(todo)} to process "
+          f"with {args.workers} workers")
+
+    processor_kwargs = {"sfreq": args.sfreq, "window_size": args.window_size, "hop": args.hop,
+                        "filter_method": args.filter_method, "n_jobs": args.filter_jobs,
+                        "psd_method": args.psd_method, "artifact_method": args.artifact_method,
+                        "spatial_levels": tuple(args.spatial)}
+    errors = {}
+    t_start = time.perf_counter()
+    done_bytes = 0
+    if todo:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(run_one, f, processor_kwargs, args.low_memory): f for f in todo}
+            for i, future in enumerate(as_completed(futures), 1):
+                file_path = futures[future]
+                try:
+                    result, elapsed = future.result()
+                    write_outputs(result, args.out, names[file_path], args.parquet)
+                    status = f"{elapsed:6.1f}s  {result['metadata']['windows']} windows"
+                except Exception as e:
+                    errors[file_path] = f"{type(e).__name__}: {e}"
+                    status = f"FAILED {errors[file_path]}"
+                done_bytes += os.path.getsize(file_path)
+                wall = time.perf_counter() - t_start
+                print(f"[{i}/{len(todo)}] {file_path}  {status}  | {i / wall:.2f} files/s, "
+                      f"{done_bytes / wall / 1e6:.1f} MB/s")
+
+    # Cohort summary over every file, including the ones done in previous runs
+    rows = []
+    for file_path in files:
+        out_path = os.path.join(args.out, f"{names[file_path]}.json")
+        if file_path in errors or not os.path.exists(out_path):
+            rows.append({"file": file_path, "error": errors.get(file_path, "missing output")})
+            continue
+        with open(out_path) as f:
+            rows.append(summary_row(file_path, json.load(f)))
+    summary = pd.DataFrame(rows)
+    if "error" in summary:
+        summary = summary[[c for c in summary.columns if c != "error"] + ["error"]]
+    summary.to_csv(os.path.join(args.out, "cohort_summary.csv"), index=False)
+    if args.parquet:
+        summary.to_parquet(os.path.join(args.out, "cohort_summary.parquet"), index=False)
+
+    wall = time.perf_counter() - t_start
+    print(f"\nProcessed {len(todo) - len(errors)} files ({len(errors)} failed) in {wall:.1f}s"
+          + (f", {len(todo) / wall:.2f} files/s, {done_bytes / wall / 1e6:.1f} MB/s" if todo else ""))
+    print(f"Summary written to {os.path.join(args.out, 'cohort_summary.csv')}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
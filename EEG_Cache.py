@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+# Part of every cache key: bump it whenever a code change alters the result content for an unchanged
+# config(), so the disk tier (which outlives deploys) stops serving results of the old code
+RESULT_VERSION = 1
+
+
+def cache_key(content_digest, config):
+    """Key for a result: hash of the file contents combined with the processor configuration and RESULT_VERSION."""
+    config_json = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(f"{RESULT_VERSION}:{content_digest}:{config_json}".encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed cache of analysis results.
+    Tier 1 is an in-memory LRU of max_entries results. Tier 2 (optional, enabled by disk_dir) keeps
+    one JSON file per result and evicts the least recently used files once the directory grows
+    beyond max_disk_bytes. Disk hits are promoted back into memory.
+    """
+
+    def __init__(self, max_entries=64, disk_dir=None, max_disk_bytes=1 << 30):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Cache configured from EEG_CACHE_SIZE, EEG_CACHE_DIR (disk tier off when unset) and EEG_CACHE_MAX_BYTES."""
+        return cls(
+            max_entries=int(os.environ.get("EEG_CACHE_SIZE", 64)),
+            disk_dir=os.environ.get("EEG_CACHE_DIR") or None,
+            max_disk_bytes=int(os.environ.get("EEG_CACHE_MAX_BYTES", 1 << 30))
+        )
+
+    def get(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return self._memory[key]
+        result = self._read_disk(key)
+        if result is not None:
+            self.stats["disk_hits"] += 1
+            self._remember(key, result)
+            return result
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, result):
+        self.stats["stores"] += 1
+        self._remember(key, result)
+        if self.disk_dir:
+            self._write_disk(key, result)
+
+    def metrics(self):
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {
+            **self.stats,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_usage()[0] if self.disk_dir else 0
+        }
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(path)  # mtime is the LRU clock of the disk tier
+        return result
+
+    def _write_disk(self, key, result):
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(result, f, default=float)
+        os.replace(tmp_path, path)
+
+        total, files = self._disk_usage()
+        for mtime, size, old_path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            if old_path == path:
+                continue
+            os.remove(old_path)
+            total -= size
+            self.stats["evictions"] += 1
+
+    def _disk_usage(self):
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".json"):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        return sum(f[1] for f in files), files
@@ -0,0 +1,152 @@
+"""
+Compact encodings of the analysis results, picked by content negotiation on /upload, /results
+and /jobs/{job_id}/result (Accept header, or ?format= which takes precedence):
+
+    json      application/json                     The result dict as is (default).
+    columnar  application/vnd.eeg.columnar+json    One array per field: the timeline as STATE_LABELS
+                                                   codes plus the legend, the scores as {key: [values]}.
+    arrow     application/vnd.apache.arrow.stream  Arrow IPC stream with one row per window (state as
+                                                   a dictionary column, one float64 column per score);
+                                                   the other fields are JSON in the schema metadata.
+    msgpack   application/msgpack                  The columnar layout as MessagePack (needs the
+                                                   optional msgpack package).
+
+The default JSON repeats the state labels and the four score keys for every window; the columnar
+layouts send them once, which is what matters for long recordings with dense windows.
+decode() turns any of the encodings back into the columnar dict (e.g. for the dashboard).
+"""
+import json
+
+import numpy as np
+
+FORMATS = ("json", "columnar", "arrow", "msgpack")
+MEDIA_TYPES = {
+    "json": "application/json",
+    "columnar": "application/vnd.eeg.columnar+json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "msgpack": "application/msgpack"
+}
+# Other names clients commonly send for the same formats
+MEDIA_ALIASES = {
+    "application/x-msgpack": "msgpack",
+    "application/vnd.apache.arrow.file": "arrow",
+    "*/*": "json",
+    "application/*": "json"
+}
+ARROW_METADATA_KEY = b"eeg_result"
+
+
+def negotiate(accept=None, fmt=None):
+    """
+    Format for a request: fmt (a FORMATS name) if given, else the acceptable media type with the highest
+    q value in the Accept header (the first one listed on ties), json without a header.
+    Returns None when nothing acceptable is available.
+    """
+    if fmt:
+        return fmt if fmt in FORMATS else None
+    if not accept:
+        return "json"
+    candidates = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        name = MEDIA_ALIASES.get(media_type) or next((f for f, t in MEDIA_TYPES.items() if t == media_type), None)
+        if name is not None and q > 0:
+            candidates.append((-q, position, name))
+    return min(candidates)[2] if candidates else None
+
+
+def to_columnar(result):
+    """The result with the per-window lists turned into per-field arrays (other fields are kept as they are)."""
+    # Imported here so the API process can start without loading the processing stack
+    from EEG_Processor import SCORE_KEYS, STATE_LABELS
+    codes = {label: code for code, label in enumerate(STATE_LABELS.tolist())}
+    columnar = {k: v for k, v in result.items() if k not in ("timeline", "scores")}
+    columnar["state_legend"] = STATE_LABELS.tolist()
+    columnar["states"] = [codes[state] for state in result["timeline"]]
+    columnar["scores"] = {key: [row[key] for row in result["scores"]] for key in SCORE_KEYS}
+    return columnar
+
+
+def encode(result, fmt):
+    """Body bytes of the result in one of FORMATS."""
+    if fmt == "json":
+        return _json_bytes(result)
+    if fmt == "columnar":
+        return _json_bytes(to_columnar(result))
+    if fmt == "arrow":
+        return _to_arrow(result)
+    if fmt == "msgpack":
+        msgpack = _msgpack()
+        return msgpack.packb(to_columnar(result), use_bin_type=True)
+    raise ValueError(f"Unknown format '{fmt}', expected one of {FORMATS}")
+
+
+def decode(payload, fmt):
+    """Columnar dict (see to_columnar) from a body in one of FORMATS."""
+    if fmt == "json":
+        return to_columnar(json.loads(payload))
+    if fmt == "columnar":
+        return json.loads(payload)
+    if fmt == "arrow":
+        import pyarrow as pa
+        from EEG_Processor import SCORE_KEYS
+        table = pa.ipc.open_stream(payload).read_all()
+        columnar = json.loads(table.schema.metadata[ARROW_METADATA_KEY])
+        state = table.column("state").combine_chunks()
+        columnar["state_legend"] = state.dictionary.to_pylist()
+        columnar["states"] = state.indices.to_pylist()
+        columnar["scores"] = {key: table.column(key).to_pylist() for key in SCORE_KEYS}
+        return columnar
+    if fmt == "msgpack":
+        return _msgpack().unpackb(payload, raw=False)
+    raise ValueError(f"Unknown format '{fmt}', expected one of {FORMATS}")
+
+
+def available(fmt):
+    """Whether the optional dependency of a format is installed."""
+    try:
+        if fmt == "arrow":
+            import pyarrow  # noqa: F401
+        elif fmt == "msgpack":
+            _msgpack()
+    except ImportError:
+        return False
+    return True
+
+
+def _json_bytes(obj):
+    # Same output as the API's default JSON response
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _to_arrow(result):
+    import pyarrow as pa
+    from EEG_Processor import SCORE_KEYS, STATE_LABELS
+    codes = {label: code for code, label in enumerate(STATE_LABELS.tolist())}
+    states = pa.DictionaryArray.from_arrays(
+        pa.array([codes[state] for state in result["timeline"]], type=pa.int8()),
+        pa.array(STATE_LABELS.tolist())
+    )
+    scores = np.array([[row[key] for key in SCORE_KEYS] for row in result["scores"]],
+                      dtype=np.float64).reshape(-1, len(SCORE_KEYS))
+    rest = {k: v for k, v in result.items() if k not in ("timeline", "scores")}
+    table = pa.table(
+        {"state": states, **{key: scores[:, i] for i, key in enumerate(SCORE_KEYS)}},
+        metadata={ARROW_METADATA_KEY: _json_bytes(rest)}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _msgpack():
+    import msgpack
+    return msgpack
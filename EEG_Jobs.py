@@ -0,0 +1,118 @@
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+
+SPOOL_CHUNK = 1 << 20  # 1MB
+
+
+def process_job(file_path, processor_kwargs, job_id, progress, subject_id=None):
+    """
+    Runs in a worker process. Uses the streaming path so memory stays bounded on long recordings
+    and progress can be reported per window through the shared progress dict.
+    Overlapping windows and the IIR filter need the whole recording, which the low memory mode keeps as
+    a single in place buffer (progress then jumps from 0 to done), like EEG_Batch.run_one.
+    """
+    from EEG_Processor import EEGProcessor
+    from EEG_Readers import get_reader
+    processor = EEGProcessor(**processor_kwargs)
+    total = processor.expected_windows(get_reader(file_path).n_samples(file_path))
+    progress[job_id] = (0, total)
+    if processor.hop < processor.window_size or processor.filter_method == "iir":
+        processor = EEGProcessor(**{**processor_kwargs, "low_memory": True})
+        return processor.process_file(file_path, subject_id=subject_id)
+    return processor.process_streaming(
+        file_path,
+        progress=lambda done: progress.__setitem__(job_id, (done, total)),
+        subject_id=subject_id
+    )
+
+
+def upload_suffix(filename):
+    """File extension used to pick the reader; unknown or missing extensions are read as CSV."""
+    from EEG_Readers import READERS
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext in READERS else ".csv"
+
+
+async def spool_upload(upload):
+    """
+    Copies an UploadFile into a private temp file in the system temp dir (or EEG_SPOOL_DIR) so a
+    worker process can read it by path. The name is random, never derived from the client's filename;
+    only a known extension is kept so the right reader is used.
+    The contents are hashed on the way through; returns (path, sha256 hex digest).
+    """
+    suffix = upload_suffix(upload.filename)
+    fd, path = tempfile.mkstemp(prefix="eeg_upload_", suffix=suffix, dir=os.environ.get("EEG_SPOOL_DIR"))
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = await upload.read(SPOOL_CHUNK)
+                if not block:
+                    break
+                digest.update(block)
+                out.write(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+class JobStore:
+    """
+    In-memory registry of submitted jobs. Finished jobs (done or failed) are kept for ttl_sec
+    seconds, and when more than max_jobs are stored the oldest finished ones are evicted first.
+    """
+
+    def __init__(self, max_jobs=100, ttl_sec=3600):
+        self.max_jobs = max_jobs
+        self.ttl_sec = ttl_sec
+        self._jobs = OrderedDict()
+
+    @classmethod
+    def from_env(cls):
+        """Store configured from EEG_JOB_STORE_SIZE / EEG_JOB_TTL_SEC."""
+        return cls(int(os.environ.get("EEG_JOB_STORE_SIZE", 100)), float(os.environ.get("EEG_JOB_TTL_SEC", 3600)))
+
+    def create(self):
+        self.evict(reserve=1)
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = {
+            "job_id": job_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        return self._jobs[job_id]
+
+    def get(self, job_id):
+        self.evict()
+        return self._jobs.get(job_id)
+
+    def finish(self, job_id, result=None, error=None):
+        job = self._jobs.get(job_id)
+        if job is None:
+            return
+        job["status"] = "failed" if error is not None else "done"
+        job["result"], job["error"] = result, error
+        job["finished_at"] = time.time()
+
+    def evict(self, reserve=0):
+        now = time.time()
+        finished = [j for j in self._jobs.values() if j["finished_at"] is not None]
+        for job in finished:
+            if now - job["finished_at"] > self.ttl_sec:
+                del self._jobs[job["job_id"]]
+        # Over capacity: drop the oldest finished jobs (insertion order = submission order)
+        for job in [j for j in finished if j["job_id"] in self._jobs]:
+            if len(self._jobs) <= self.max_jobs - reserve:
+                break
+            del self._jobs[job["job_id"]]
+
+    def __len__(self):
+        return len(self._jobs)
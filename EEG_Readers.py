@@ -0,0 +1,222 @@
+import os
+
+import numpy as np
+import pandas as pd
+import mne
+
+# Columns that are never EEG channels, in every input format
+EXCLUDED_COLUMNS = ['label', 'time', 'timestamp', 'index']
+
+READERS = {}
+
+
+def eeg_columns(columns):
+    """Every column that is not a label/time/index column is treated as an EEG channel."""
+    return [col for col in columns if col not in EXCLUDED_COLUMNS]
+
+
+def register_reader(reader_cls):
+    """Class decorator that makes a reader available for each of its file extensions."""
+    reader = reader_cls()
+    for ext in reader_cls.extensions:
+        READERS[ext] = reader
+    return reader_cls
+
+
+def get_reader(file_path, fmt=None):
+    """Picks the reader from fmt (an extension such as '.parquet') or from the file extension."""
+    ext = (fmt or os.path.splitext(str(file_path))[1]).lower()
+    if not ext.startswith('.'):
+        ext = '.' + ext
+    if ext not in READERS:
+        raise ValueError(f"Unsupported file format '{ext}', expected one of {sorted(READERS)}")
+    return READERS[ext]
+
+
+def read_recording(file_path, fmt=None):
+    """
+    Loads a whole recording. Returns (ch_names, data, sfreq) with data shaped (n_channels, n_times)
+    and sfreq None when the format doesn't store it.
+    """
+    return get_reader(file_path, fmt).read(file_path)
+
+
+def iter_recording(file_path, fmt=None, chunk_rows=7500):
+    """Yields (ch_names, block) with blocks of at most chunk_rows samples, shaped (n_channels, n_times)."""
+    return get_reader(file_path, fmt).iter_chunks(file_path, chunk_rows)
+
+
+class RecordingReader:
+    """
+    Base class for the input readers. Tabular formats have rows = time points and columns = channels,
+    and all of them drop the EXCLUDED_COLUMNS the same way.
+    """
+    extensions = ()
+
+    def read(self, file_path):
+        """Returns (ch_names, data (n_channels, n_times), sfreq or None)."""
+        raise NotImplementedError
+
+    def iter_chunks(self, file_path, chunk_rows):
+        raise NotImplementedError
+
+    def n_samples(self, file_path):
+        """Number of samples, read from the file header/metadata where possible."""
+        raise NotImplementedError
+
+    def sfreq(self, file_path):
+        """Sampling rate stored in the file, None for formats that don't store it."""
+        return None
+
+
+@register_reader
+class CSVReader(RecordingReader):
+    extensions = ('.csv',)
+
+    def read(self, file_path):
+        df = pd.read_csv(file_path)
+        ch_names = eeg_columns(df.columns)
+        return ch_names, df[ch_names].values.T, None
+
+    def iter_chunks(self, file_path, chunk_rows):
+        for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+            ch_names = eeg_columns(chunk.columns)
+            yield ch_names, chunk[ch_names].to_numpy(dtype=np.float64).T
+
+    def n_samples(self, file_path):
+        """Counts the data rows (lines minus the header) without parsing the file."""
+        n_lines, last = 0, b"\n"
+        with open(file_path, "rb") as f:
+            while True:
+                block = f.read(1 << 20)
+                if not block:
+                    break
+                n_lines += block.count(b"\n")
+                last = block[-1:]
+        if last != b"\n":
+            n_lines += 1
+        return max(0, n_lines - 1)
+
+
+@register_reader
+class ParquetReader(RecordingReader):
+    """Parquet through pyarrow. Only the EEG columns are read and each becomes one row of the output."""
+    extensions = ('.parquet', '.pq')
+
+    def _open(self, file_path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files requires pyarrow (pip install pyarrow)")
+        parquet_file = pq.ParquetFile(file_path)
+        return parquet_file, eeg_columns(parquet_file.schema_arrow.names)
+
+    def read(self, file_path):
+        parquet_file, ch_names = self._open(file_path)
+        table = parquet_file.read(columns=ch_names)
+        return ch_names, _table_to_array(table, ch_names), None
+
+    def iter_chunks(self, file_path, chunk_rows):
+        parquet_file, ch_names = self._open(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=ch_names):
+            yield ch_names, _table_to_array(batch, ch_names)
+
+    def n_samples(self, file_path):
+        return self._open(file_path)[0].metadata.num_rows
+
+
+@register_reader
+class ArrowReader(RecordingReader):
+    """Arrow IPC / Feather v2 files, memory mapped so nothing is parsed or copied until the columns are stacked."""
+    extensions = ('.arrow', '.feather', '.ipc')
+
+    def _open(self, file_path):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Reading Arrow/Feather files requires pyarrow (pip install pyarrow)")
+        reader = pa.ipc.open_file(pa.memory_map(str(file_path), 'r'))
+        return reader, eeg_columns(reader.schema.names)
+
+    def read(self, file_path):
+        reader, ch_names = self._open(file_path)
+        return ch_names, _table_to_array(reader.read_all().select(ch_names), ch_names), None
+
+    def iter_chunks(self, file_path, chunk_rows):
+        reader, ch_names = self._open(file_path)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i).select(ch_names)
+            for start in range(0, batch.num_rows, chunk_rows):
+                yield ch_names, _table_to_array(batch.slice(start, chunk_rows), ch_names)
+
+    def n_samples(self, file_path):
+        reader, _ = self._open(file_path)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+@register_reader
+class NPYReader(RecordingReader):
+    """
+    Raw .npy arrays, memory mapped. Rows = time points, columns = channels.
+    A structured array carries the channel names in its field names (and the label/time fields are dropped);
+    a plain 2-D array gets generic names EEG000, EEG001, ...
+    """
+    extensions = ('.npy',)
+
+    def _open(self, file_path):
+        arr = np.load(file_path, mmap_mode='r')
+        if arr.dtype.names:
+            return arr, eeg_columns(arr.dtype.names)
+        if arr.ndim != 2:
+            raise ValueError(f"Expected a 2-D (n_times, n_channels) array, got shape {arr.shape}")
+        return arr, [f"EEG{i:03d}" for i in range(arr.shape[1])]
+
+    def _block(self, arr, ch_names, start, stop):
+        if arr.dtype.names:
+            return np.stack([arr[name][start:stop] for name in ch_names]).astype(np.float64)
+        return arr[start:stop].T
+
+    def read(self, file_path):
+        arr, ch_names = self._open(file_path)
+        return ch_names, self._block(arr, ch_names, 0, len(arr)), None
+
+    def iter_chunks(self, file_path, chunk_rows):
+        arr, ch_names = self._open(file_path)
+        for start in range(0, len(arr), chunk_rows):
+            yield ch_names, np.asarray(self._block(arr, ch_names, start, start + chunk_rows), dtype=np.float64)
+
+    def n_samples(self, file_path):
+        return len(self._open(file_path)[0])
+
+
+@register_reader
+class EDFReader(RecordingReader):
+    """EDF/BDF through MNE. The data comes back in Volts and the file's own sampling rate is reported."""
+    extensions = ('.edf', '.bdf')
+
+    def _open(self, file_path):
+        raw = mne.io.read_raw(file_path, preload=False, verbose=False)
+        return raw, eeg_columns(raw.ch_names)
+
+    def read(self, file_path):
+        raw, ch_names = self._open(file_path)
+        return ch_names, raw.get_data(picks=ch_names), raw.info['sfreq']
+
+    def iter_chunks(self, file_path, chunk_rows):
+        raw, ch_names = self._open(file_path)
+        for start in range(0, raw.n_times, chunk_rows):
+            yield ch_names, raw.get_data(picks=ch_names, start=start, stop=min(start + chunk_rows, raw.n_times))
+
+    def n_samples(self, file_path):
+        return self._open(file_path)[0].n_times
+
+    def sfreq(self, file_path):
+        return self._open(file_path)[0].info['sfreq']
+
+
+def _table_to_array(table, ch_names):
+    """Stacks Arrow columns into a (n_channels, n_times) float64 array, one column per row."""
+    out = np.empty((len(ch_names), table.num_rows))
+    for i, name in enumerate(ch_names):
+        out[i] = table.column(name).to_numpy()
+    return out
@@ -0,0 +1,131 @@
+"""
+Spectral engine for the window PSDs: estimators that work directly on NumPy window arrays
+(..., n_times), selectable with EEGProcessor(psd_method=...).
+
+    "mne"         mne.time_frequency.psd_array_welch, what epochs.compute_psd(method='welch') runs
+                  (n_fft=2048, or the window length for shorter windows). The reference.
+    "welch"       The same Welch estimate (n_fft sample Hamming segments without overlap, mean
+                  removed, density scaling, one sided) for every window and channel at once: the
+                  segments are reshaped views of the windows and go through one batched rfft per
+                  block of signals. Identical to "mne" up to float rounding (~1e-15 relative); what
+                  is saved is MNE's per call checks and bookkeeping, and windows don't need to be
+                  copied into an Epochs object first.
+    "multitaper"  DPSS multitaper PSD over the whole window (half bandwidth 4, the low bias tapers,
+                  eigenvalue weighted, density scaling like mne's psd_array_multitaper with
+                  normalization='full'), for quality runs. Over a 30s window it averages 7 tapers
+                  at a 0.27 Hz resolution where Welch averages 3 segments and leaves the last 5.2s
+                  out, so the band powers are less noisy and see the whole window; it costs about
+                  30x "welch". It changes the results (and the cache key), mostly in Delta/Theta.
+"welch" and "multitaper" process the signals in blocks of ~block_bytes and split them over n_jobs
+threads (scipy's FFTs release the GIL), which pays off for high channel counts.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import mne
+from scipy.fft import rfft, rfftfreq
+from scipy.signal import get_window
+
+PSD_METHODS = ("mne", "welch", "multitaper")
+N_FFT = 2048
+
+
+@lru_cache(maxsize=8)
+def welch_window(n_fft):
+    """Hamming window of the Welch segments (read only, shared between calls)."""
+    win = get_window('hamming', n_fft)
+    win.flags.writeable = False
+    return win
+
+
+@lru_cache(maxsize=8)
+def dpss_tapers(n_times, half_nbw=4.0):
+    """Low bias DPSS tapers (n_tapers, n_times) and their eigenvalues for a window length, as mne designs them."""
+    tapers, eigvals = mne.time_frequency.dpss_windows(n_times, half_nbw, int(2 * half_nbw), sym=False,
+                                                      low_bias=True)
+    tapers.flags.writeable = False
+    eigvals.flags.writeable = False
+    return tapers, eigvals
+
+
+def psd_freqs(n_times, sfreq, fmin, fmax, method="welch", n_fft=N_FFT):
+    """Frequency grid of compute_psd for windows of n_times samples, and its slice of the rfft bins."""
+    freqs = rfftfreq(min(n_fft, n_times) if method != "multitaper" else n_times, 1 / sfreq)
+    freq_sl = slice(np.searchsorted(freqs, fmin, side='left'), np.searchsorted(freqs, fmax, side='right'))
+    return freqs[freq_sl], freq_sl
+
+
+def compute_psd(data, sfreq, fmin=.5, fmax=45, method="welch", n_fft=N_FFT, n_jobs=1, block_bytes=1 << 25):
+    """
+    PSD (..., n_freqs) of data (..., n_times) between fmin and fmax, and the frequencies.
+    data can be a strided view (e.g. the windows of a buffer): it is only copied one block at a time.
+    Windows shorter than n_fft are a single Welch segment of their own length, as in epochs.compute_psd.
+    """
+    if method not in PSD_METHODS:
+        raise ValueError(f"Unknown PSD method '{method}', expected one of {PSD_METHODS}")
+    n_times = data.shape[-1]
+    n_fft = min(n_fft, n_times)
+    if method == "mne":
+        return mne.time_frequency.psd_array_welch(data, sfreq, fmin=fmin, fmax=fmax, n_fft=n_fft, verbose=False)
+
+    data = np.asarray(data)
+    freqs, freq_sl = psd_freqs(n_times, sfreq, fmin, fmax, method, n_fft)
+    if method == "welch":
+        estimate = lambda x: _welch(x, sfreq, n_fft, freq_sl)
+        bytes_per_signal = n_times * 8 * 2
+    else:
+        tapers, eigvals = dpss_tapers(n_times)
+        estimate = lambda x: _multitaper(x, sfreq, tapers, eigvals, freq_sl)
+        bytes_per_signal = n_times * 8 * 2 * len(tapers)
+
+    # Blocks along the first axis, with at least one block per thread
+    rows = data.reshape(1, -1, n_times) if data.ndim < 3 else data
+    out = np.empty(rows.shape[:-1] + (len(freqs),))
+    signals_per_row = int(np.prod(rows.shape[1:-1]))
+    block = max(1, block_bytes // (signals_per_row * bytes_per_signal))
+    n_jobs = max(1, min(n_jobs, rows.shape[0] * signals_per_row))
+    if n_jobs > 1 and rows.shape[0] < n_jobs:
+        # Few windows of many channels (e.g. one window at a time): the threads split the channels instead
+        rows, out = rows.reshape(-1, 1, n_times), out.reshape(-1, 1, len(freqs))
+        block = max(1, block_bytes // bytes_per_signal)
+    block = min(block, -(-rows.shape[0] // n_jobs))
+
+    def run(start):
+        x = rows[start:start + block]
+        out[start:start + block] = estimate(x.reshape(-1, n_times)).reshape(x.shape[:-1] + (len(freqs),))
+
+    starts = range(0, rows.shape[0], block)
+    if n_jobs == 1:
+        for start in starts:
+            run(start)
+    else:
+        with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+            list(pool.map(run, starts))
+    return out.reshape(data.shape[:-1] + (len(freqs),)), freqs
+
+
+def _welch(x, sfreq, n_fft, freq_sl):
+    """Welch PSD of the rows of x (n_signals, n_times), non overlapping segments like psd_array_welch."""
+    n_seg = x.shape[-1] // n_fft
+    win = welch_window(n_fft)
+    seg = x[:, :n_seg * n_fft].reshape(len(x), n_seg, n_fft)
+    seg = (seg - seg.mean(axis=-1, keepdims=True)) * win
+    power = np.abs(rfft(seg, axis=-1)[..., freq_sl]) ** 2
+    psd = power.mean(axis=1) / (sfreq * (win * win).sum())
+    return _one_sided(psd, n_fft, freq_sl)
+
+
+def _multitaper(x, sfreq, tapers, eigvals, freq_sl):
+    """Eigenvalue weighted multitaper PSD of the rows of x (n_signals, n_times)."""
+    x = x - x.mean(axis=-1, keepdims=True)
+    power = np.abs(rfft(x[:, np.newaxis, :] * tapers, axis=-1)[..., freq_sl]) ** 2
+    psd = np.einsum('k,nkf->nf', eigvals, power) / (eigvals.sum() * sfreq)
+    return _one_sided(psd, x.shape[-1], freq_sl)
+
+
+def _one_sided(psd, n_fft, freq_sl):
+    """Every bin but DC and Nyquist carries the power of its negative frequency twin."""
+    bins = np.arange(freq_sl.start, freq_sl.stop)
+    psd[..., (bins > 0) & (2 * bins != n_fft)] *= 2
+    return psd
@@ -0,0 +1,222 @@
+import numpy as np
+from scipy.signal import oaconvolve
+
+from EEG_Artifacts import window_artifacts
+from EEG_Filters import fir_kernel
+
+
+class StreamingFilter:
+    """
+    Zero-phase FIR bandpass that can be fed chunk by chunk.
+    It uses the same kernel and the same 'reflect_limited' edge padding as
+    raw.filter(l_freq, h_freq, fir_design='firwin'), so concatenating the outputs of
+    push() and flush() gives the same signal as filtering the whole recording at once.
+    Only the last len(h) samples are kept between chunks (the filter state).
+    The output lags the input by len(h) // 2 samples (3.3s at 250Hz for 0.5-45Hz).
+    """
+
+    def __init__(self, sfreq, l_freq=0.5, h_freq=45.0):
+        self.h = fir_kernel(sfreq, l_freq, h_freq)
+        self.n_edge = len(self.h) - 1
+        self.delay = self.n_edge // 2
+        self._pending = []      # Raw chunks received before there is enough data for the left padding
+        self._buf = None        # Last n_edge padded input samples (the convolution state)
+        self._tail = None       # Last n_edge + 1 input samples, used for the right padding
+        self._n_in = 0
+        self._n_out = 0
+        self._to_skip = self.delay
+
+    def push(self, x):
+        """Feeds a (n_channels, n_times) chunk and returns the filtered samples that are now final."""
+        x = np.asarray(x, dtype=np.float64)
+        self._n_in += x.shape[1]
+        if self._buf is None:
+            self._pending.append(x)
+            if sum(p.shape[1] for p in self._pending) <= self.n_edge:
+                return self._empty(x.shape[0])
+            x = np.concatenate(self._pending, axis=1)
+            self._pending = []
+            left_pad = 2 * x[:, :1] - x[:, self.n_edge:0:-1]
+            self._buf = left_pad
+        self._tail = np.concatenate([self._tail, x], axis=1)[:, -(self.n_edge + 1):] if self._tail is not None \
+            else x[:, -(self.n_edge + 1):]
+        return self._convolve(x)
+
+    def flush(self):
+        """Applies the right edge padding and returns the remaining filtered samples."""
+        if self._buf is None:
+            raise ValueError(f"Recording is too short to filter ({self._n_in} samples, "
+                             f"need more than {self.n_edge})")
+        x = self._tail
+        right_pad = 2 * x[:, -1:] - x[:, -2:-self.n_edge - 2:-1]
+        out = self._convolve(right_pad)
+        # Only n_in samples exist in the output, the rest is padding
+        n_keep = self._n_in - (self._n_out - out.shape[1])
+        self._n_out = self._n_in
+        return out[:, :n_keep]
+
+    def _convolve(self, x):
+        buf = np.concatenate([self._buf, x], axis=1)
+        out = oaconvolve(buf, self.h[np.newaxis], mode='valid', axes=1)
+        self._buf = buf[:, -self.n_edge:]
+        if self._to_skip:
+            skip = min(self._to_skip, out.shape[1])
+            out = out[:, skip:]
+            self._to_skip -= skip
+        self._n_out += out.shape[1]
+        return out
+
+    @staticmethod
+    def _empty(n_channels):
+        return np.empty((n_channels, 0))
+
+
+class WindowStream:
+    """
+    Incremental version of the preprocessing + windowing in EEGProcessor.process_csv:
+    bandpass filter -> average reference -> fixed length windows.
+    Windows follow the same layout as mne.Epochs(tmin=0, tmax=window_size), i.e. window k
+    covers samples [k * step, k * step + step] inclusive, and is emitted as soon as its
+    last sample has been filtered. At most one window (plus the filter state) is held in memory.
+    An EEG_Artifacts.ArtifactDetector passed as detector is fed every filtered, referenced sample,
+    so its segments up to the end of a window are judged by the time the window is emitted.
+    """
+
+    def __init__(self, processor, detector=None):
+        self.sfreq = processor.sfreq
+        if processor.hop < processor.window_size:
+            raise ValueError("Overlapping windows (hop < window_size) are only supported by process_csv/process_file")
+        if processor.filter_method == "iir":
+            raise ValueError("The zero-phase IIR filter needs the whole recording, use the 'fir' or 'fft' method")
+        self.step = int(round(processor.window_size * processor.sfreq))
+        self.n_window = self.step + 1
+        self.filter = StreamingFilter(processor.sfreq)
+        self.detector = detector
+        self._buf = None
+        self.n_windows = 0
+
+    def push(self, samples):
+        """Feeds raw (n_channels, n_times) samples and returns a list of completed windows."""
+        return self._collect(self.filter.push(samples))
+
+    def flush(self):
+        """Ends the stream and returns any windows completed by the remaining samples."""
+        return self._collect(self.filter.flush())
+
+    def _collect(self, filtered):
+        # Average reference (same as set_eeg_reference('average', projection=False))
+        filtered -= filtered.mean(axis=0, keepdims=True)
+        if self.detector is not None:
+            self.detector.push(filtered)
+        self._buf = filtered if self._buf is None else np.concatenate([self._buf, filtered], axis=1)
+        windows = []
+        while self._buf.shape[1] >= self.n_window:
+            windows.append(self._buf[:, :self.n_window])
+            self._buf = self._buf[:, self.step:]
+            self.n_windows += 1
+        return windows
+
+
+class LiveSession:
+    """
+    Per-connection state for live streaming: incremental filtering/windowing through a
+    WindowStream and a running session baseline.
+    The baseline is the running mean of the clean window spectra, so each new window costs
+    O(1) to fold in instead of recomputing over all the past data. Until a clean window has
+    been seen the running mean of all windows is used and quality_warning is set,
+    mirroring the fallback in process_csv.
+    With artifact_method="adaptive" the windows are screened by an ArtifactDetector that only keeps
+    the segments of the last window and its warm-up, so the state stays bounded however long the
+    session runs. Windows that complete before the detector's warm-up is over (windows shorter than
+    warmup_segments) are held and scored once it is, so they get the same decisions as in process_csv.
+    """
+
+    def __init__(self, processor, ch_names, scale=None):
+        self.processor = processor
+        self.ch_names = list(ch_names)
+        self.scale = scale  # Decided from the first frame when not given
+        self.detector = None
+        if processor.artifact_method == "adaptive":
+            thr = processor.adaptive_thresholds
+            n_keep = int(np.ceil(processor.window_size / thr['segment_sec'])) + thr['warmup_segments'] + 2
+            self.detector = processor._artifact_detector(self.ch_names, keep_segments=n_keep)
+        self.stream = WindowStream(processor, self.detector)
+        self.samples_received = 0
+        self._clean_sum, self._n_clean = None, 0
+        self._all_sum, self._n_all = None, 0
+        self.n_windows = 0
+        self._held = []
+
+    def push(self, samples):
+        """
+        Feeds raw (n_channels, n_times) samples and returns one result dict per completed window.
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        if samples.shape[0] != len(self.ch_names):
+            raise ValueError(f"Expected {len(self.ch_names)} channels, got {samples.shape[0]}")
+        if self.scale is None and np.any(samples):
+            # Same microvolt detection as _scale_data, but decided once on the first frame
+            max_abs = np.max(np.abs(samples))
+            self.scale = self.processor._scale_data(np.array([max_abs]))[0] / max_abs
+        self.samples_received += samples.shape[1]
+        return self._score_ready(self.stream.push(samples * (self.scale or 1.0)))
+
+    def flush(self):
+        """Ends the session and scores any window completed by the filter tail or still held for the warm-up."""
+        windows = self.stream.flush()
+        if self.detector is not None:
+            self.detector.flush()
+        windows, self._held = self._held + windows, []
+        return [self._score_window(w) for w in windows]
+
+    def _score_ready(self, windows):
+        """Scores the held and the new windows, or holds them all while the detector is warming up."""
+        self._held += windows
+        if self.detector is not None and not self.detector.stats.ready:
+            return []
+        windows, self._held = self._held, []
+        return [self._score_window(w) for w in windows]
+
+    def _score_window(self, window):
+        proc = self.processor
+        psd, freqs = proc._compute_psd(window)
+        spectrum = psd.mean(axis=0)
+        artifacts = None
+        if self.detector is not None:
+            start = self.n_windows * self.stream.step
+            codes, blinks = self.detector.segment_codes(start, start + self.stream.n_window)
+            is_noisy, bad = window_artifacts(codes, max_bad_fraction=proc.adaptive_thresholds['max_bad_fraction'])
+            artifacts = {"bad_fraction": round(float(bad.mean()), 3) if len(bad) else 0.0,
+                         "blink_times_sec": [round(b / proc.sfreq, 3) for b in blinks]}
+        else:
+            ptp, ch_std = proc._channel_stats(window[np.newaxis])
+            is_noisy = bool(proc._screen_channel_stats(ptp, ch_std, self.ch_names)["noisy_epochs"][0])
+
+        self._all_sum = spectrum.copy() if self._all_sum is None else self._all_sum + spectrum
+        self._n_all += 1
+        if not is_noisy:
+            self._clean_sum = spectrum.copy() if self._clean_sum is None else self._clean_sum + spectrum
+            self._n_clean += 1
+        if self._n_clean:
+            baseline_spectrum = self._clean_sum / self._n_clean
+        else:
+            baseline_spectrum = self._all_sum / self._n_all
+
+        state, scores = proc._classify_state(
+            proc._calculate_band_metrics(spectrum, freqs),
+            proc._calculate_band_metrics(baseline_spectrum, freqs),
+            is_noisy=is_noisy
+        )
+        index = self.n_windows
+        self.n_windows += 1
+        result = {
+            "window": index,
+            "start_sec": index * proc.window_size,
+            "state": state,
+            "scores": scores,
+            "quality_warning": self._n_clean == 0,
+            "samples_received": self.samples_received
+        }
+        if artifacts is not None:
+            result["artifacts"] = artifacts
+        return result
@@ -0,0 +1,134 @@
+"""
+Server side preparation of the dashboard plots, so long sessions stay light to draw:
+
+    timeline_segments  run-length merged state timeline: one segment per run of equal states
+                       instead of one bar per window, with the times taken from the result metadata
+    lttb / minmax      downsampling of the score series to a point budget
+    result_view        both for a time range of a result, served by GET /results/{sha256}/view;
+                       zooming in asks for a narrower range with the same budget, so the detail
+                       comes back as the range shrinks
+
+Window k starts at k * hop_sec. A segment runs from the start of its first window to the start
+of the window after its last one (the end of the last window for the final segment), so the
+segments tile the session without overlapping even when the windows do.
+"""
+import numpy as np
+
+DOWNSAMPLING_METHODS = ("lttb", "minmax")
+
+
+def window_starts(metadata):
+    """Start time in seconds of every window of a result."""
+    return np.arange(metadata["windows"]) * float(metadata["hop_sec"])
+
+
+def timeline_segments(timeline, metadata, start_sec=None, end_sec=None):
+    """
+    [{"state", "start_sec", "end_sec", "windows"}] for the runs of equal states of timeline (labels or
+    codes), clipped to [start_sec, end_sec] when given. "windows" is the number of windows in the run.
+    """
+    states = np.asarray(timeline)
+    n = len(states)
+    if n == 0:
+        return []
+    hop, window = float(metadata["hop_sec"]), float(metadata["window_size_sec"])
+    run_starts = np.flatnonzero(np.r_[True, states[1:] != states[:-1]])
+    run_stops = np.r_[run_starts[1:], n]
+    starts = run_starts * hop
+    ends = run_stops * hop
+    ends[-1] = (n - 1) * hop + window
+    lo = -np.inf if start_sec is None else start_sec
+    hi = np.inf if end_sec is None else end_sec
+    keep = (ends > lo) & (starts < hi)
+    return [
+        {"state": states[run_starts[i]].item(), "start_sec": float(max(starts[i], lo)), "end_sec": float(min(ends[i], hi)),
+         "windows": int(run_stops[i] - run_starts[i])}
+        for i in np.flatnonzero(keep)
+    ]
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of n_out points of (x, y) that keep the visual shape of
+    the series. The first and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    n_out = max(n_out, 3)
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    # Buckets of the points between the first and the last one
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Third vertex: the average of the next bucket (the last point for the last bucket)
+        if b + 2 < len(edges):
+            nxt = slice(edges[b + 1], edges[b + 2])
+            cx, cy = x[nxt].mean(), y[nxt].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[b + 1] = a
+    return picked
+
+
+def minmax(y, n_out):
+    """Indices of the minimum and maximum of y in n_out // 2 equal buckets, in order (keeps every spike)."""
+    n = len(y)
+    n_buckets = max(1, n_out // 2)
+    if n_buckets * 2 >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    picked = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        picked += [lo + int(np.nanargmin(y[lo:hi])), lo + int(np.nanargmax(y[lo:hi]))]
+    return np.unique(picked)
+
+
+def result_view(result, start_sec=None, end_sec=None, points=1000, method="lttb"):
+    """
+    What the dashboard draws for [start_sec, end_sec] of a result (the whole session by default):
+    the timeline segments of that range and every score series cut to it and downsampled to at most
+    points points, as {"t": [window start times], "y": [values]}. The window count, window size and
+    hop are passed along for the axis.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}', expected one of {DOWNSAMPLING_METHODS}")
+    metadata = result["metadata"]
+    timeline = result["timeline"] if "timeline" in result else \
+        [result["state_legend"][c] for c in result["states"]]
+    scores = result["scores"]
+    if isinstance(scores, list):
+        scores = {key: [row[key] for row in scores] for key in (scores[0] if scores else {})}
+
+    t = window_starts(metadata)
+    session_end = float(t[-1] + metadata["window_size_sec"]) if len(t) else 0.0
+    lo = 0.0 if start_sec is None else float(start_sec)
+    hi = session_end if end_sec is None else float(end_sec)
+    # Windows overlapping the range, plus one on each side so the lines run to the edges
+    first = max(0, int(np.searchsorted(t, lo, side='right')) - 2)
+    last = min(len(t), int(np.searchsorted(t, hi, side='right')) + 1)
+    t_range = t[first:last]
+
+    series, downsampled = {}, False
+    for key, values in scores.items():
+        y = np.asarray(values, dtype=np.float64)[first:last]
+        idx = lttb(t_range, y, points) if method == "lttb" else minmax(y, points)
+        downsampled |= len(idx) < len(y)
+        series[key] = {"t": t_range[idx].tolist(), "y": y[idx].tolist()}
+    return {
+        "range": [lo, hi],
+        "windows": metadata["windows"],
+        "windows_in_range": int(last - first),
+        "window_size_sec": metadata["window_size_sec"],
+        "hop_sec": metadata["hop_sec"],
+        "method": method,
+        "downsampled": downsampled,
+        "segments": timeline_segments(timeline, metadata, lo, hi),
+        "scores": series
+    }
@@ -0,0 +1,126 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from EEG_Metrics import SamplingProfiler
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the waiting queue is full."""
+
+
+def process_file(file_path, processor_kwargs, profile=False, subject_id=None):
+    """
+    Runs in a worker process. A fresh EEGProcessor is built for every request so state
+    such as quality_warning is never shared between uploads.
+    With profile the run is sampled by a SamplingProfiler and its report is put in metadata["profile"].
+    subject_id normalizes against (and updates) that subject's stored baseline.
+    """
+    from EEG_Processor import EEGProcessor
+    processor = EEGProcessor(**processor_kwargs)
+    if not profile:
+        return processor.process_file(file_path, subject_id=subject_id)
+    with SamplingProfiler() as profiler:
+        result = processor.process_file(file_path, subject_id=subject_id)
+    result["metadata"]["profile"] = profiler.report()
+    return result
+
+
+def warm_up(processor_kwargs):
+    """
+    Imports the processing stack (mne, scipy, pandas) and builds the cached montages, filter kernel and
+    PSD window of the processor_kwargs configuration (see EEGProcessor.warm_up), so the first request
+    doesn't pay for them. The initializer of the API's worker processes.
+    """
+    from EEG_Processor import EEGProcessor
+    EEGProcessor(**processor_kwargs).warm_up()
+
+
+class WorkerPool:
+    """
+    Process pool for the CPU heavy processing, so the event loop stays free while files are analysed.
+    At most max_workers jobs run at once and at most max_queue more wait for a free worker;
+    anything beyond that is refused with PoolSaturated (mapped to a 429 by the API).
+    A caller that answers before the job reaches run() (e.g. a 202 for a background job) reserves its slot
+    first, so concurrent requests can't all be accepted and then refused.
+    initializer(*initargs) runs in every worker process when it starts (e.g. warm_up).
+    """
+
+    def __init__(self, max_workers=None, max_queue=None, initializer=None, initargs=()):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = self.max_workers if max_queue is None else max_queue
+        self.initializer = initializer
+        self.initargs = initargs
+        self.in_flight = 0
+        self._executor = None
+        self._manager = None
+        self._progress = None
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Pool configured from EEG_WORKERS / EEG_MAX_QUEUE (defaults: one worker per core, queue = workers)."""
+        workers = os.environ.get("EEG_WORKERS")
+        queue = os.environ.get("EEG_MAX_QUEUE")
+        return cls(int(workers) if workers else None, int(queue) if queue else None, **kwargs)
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.max_queue
+
+    @property
+    def saturated(self):
+        return self.in_flight >= self.capacity
+
+    def reserve(self):
+        """Takes a slot for a job that will be run with run(..., reserved=True), or raises PoolSaturated."""
+        if self.saturated:
+            raise PoolSaturated(f"{self.in_flight} jobs in flight (capacity {self.capacity})")
+        self.in_flight += 1
+
+    def release(self):
+        """Gives back a slot taken by reserve() for a job that won't be run after all."""
+        self.in_flight -= 1
+
+    async def run(self, fn, *args, reserved=False):
+        """
+        Runs fn(*args) in a worker process, or raises PoolSaturated if the pool is full.
+        With reserved the slot was already taken by reserve(); either way it is released when fn is done.
+        """
+        if not reserved:
+            self.reserve()
+        try:
+            self._ensure_executor()
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.release()
+
+    async def start(self):
+        """
+        Starts the worker processes now (and waits for their initializer) instead of on the first request.
+        Forked workers inherit the modules and caches the parent process has already loaded.
+        """
+        self._ensure_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, os.getpid) for _ in range(self.max_workers)))
+
+    def _ensure_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=self.initializer,
+                                                 initargs=self.initargs)
+
+    @property
+    def progress(self):
+        """Dict shared with the worker processes, used by jobs to report how far along they are."""
+        if self._progress is None:
+            self._manager = multiprocessing.Manager()
+            self._progress = self._manager.dict()
+        return self._progress
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager, self._progress = None, None
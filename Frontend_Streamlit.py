@@ -1,7 +1,11 @@
+import hashlib
 import streamlit as st
 import requests
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+import time
+from EEG_Timeline import result_view
 
 # This ensures every chart uses the exact same hex code for each state
 STATE_COLORS = {
@@ -32,7 +36,7 @@ if "uploader_key" not in st.session_state:
 st.sidebar.header("Data Input")
 uploaded_file = st.sidebar.file_uploader(
     "Upload EEG CSV", 
-    type=["csv"], 
+    type=["csv", "parquet", "feather", "arrow", "npy", "edf", "bdf"], 
     key=f"file_uploader_{st.session_state['uploader_key']}"
 )
 
@@ -47,17 +51,82 @@ if st.sidebar.button("Clear Dashboard"):
     clear_all()
 
 
+BACKEND_URL = "http://localhost:8000"
+# Score points drawn per series, whatever the session length (the backend downsamples to this)
+PLOT_POINTS = 1500
+COLUMNAR = {"Accept": "application/vnd.eeg.columnar+json"}
+
+
+def run_analysis_job(file):
+    """Submits the file as a job and polls it, so long recordings don't hold one request open."""
+    files = {"file": (file.name, file.getvalue(), file.type or "application/octet-stream")}
+    response = requests.post(f"{BACKEND_URL}/jobs", files=files)
+    if response.status_code != 202:
+        return response
+    job_id = response.json()["job_id"]
+
+    progress_bar = st.progress(0.0, text="Queued...")
+    while True:
+        status = requests.get(f"{BACKEND_URL}/jobs/{job_id}").json()
+        done, total = status["progress"]["windows_done"], status["progress"]["windows_total"]
+        if status["status"] == "running" and total:
+            progress_bar.progress(min(done / total, 1.0), text=f"Processed {done}/{total} windows")
+        if status["status"] in ("done", "failed"):
+            break
+        time.sleep(0.5)
+    progress_bar.empty()
+    return requests.get(f"{BACKEND_URL}/jobs/{job_id}/result", headers=COLUMNAR)
+
+
+def get_analysis(file):
+    """
+    Result of the file, keyed by the sha256 of its contents: kept in the session so reruns (every widget
+    interaction) don't post it again, and looked up in the backend's result cache before uploading.
+    """
+    digest = hashlib.sha256(file.getvalue()).hexdigest()
+    results = st.session_state.setdefault("results", {})
+    if digest not in results:
+        response = requests.get(f"{BACKEND_URL}/results/{digest}", headers=COLUMNAR)
+        if response.status_code == 404:
+            response = run_analysis_job(file)
+        if response.status_code != 200:
+            return digest, response
+        results[digest] = response.json()
+    return digest, results[digest]
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def fetch_view(digest, start_sec, end_sec, points=PLOT_POINTS):
+    """Timeline segments and downsampled scores for a time range (see GET /results/{sha256}/view)."""
+    response = requests.get(f"{BACKEND_URL}/results/{digest}/view",
+                            params={"start_sec": start_sec, "end_sec": end_sec, "points": points})
+    # Raised rather than returned, so a failure is not cached
+    response.raise_for_status()
+    return response.json()
+
+
+def get_view(digest, result, start_sec, end_sec, points=PLOT_POINTS):
+    """
+    fetch_view, or the same view built here from the result kept in the session when the backend no longer
+    holds it (evicted from its cache, caching off, or a different backend worker answered).
+    """
+    try:
+        return fetch_view(digest, start_sec, end_sec, points)
+    except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 404:
+            raise
+        return result_view(result, start_sec, end_sec, points)
+
+
 if uploaded_file:
     with st.spinner('Backend is processing signal...'):
         try:
-            files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "text/csv")}
-            response = requests.post("http://localhost:8000/upload", files=files)
-            
-            if response.status_code == 200:
-                data = response.json()
+            digest, data = get_analysis(uploaded_file)
+
+            if isinstance(data, dict):
                 profile = data.get("session_profile", {})
-                timeline = data.get("timeline", [])
-                scores_data = data.get("scores", [])
+                metadata = data.get("metadata", {})
+                window_sec, hop_sec = metadata.get("window_size_sec", 30), metadata.get("hop_sec", 30)
 
                 # --- TOP ROW: Profile Overview ---
                 col1, col2 = st.columns([1.5, 1])
@@ -106,23 +175,25 @@ if uploaded_file:
                 st.markdown("---")
                 st.markdown("<h3 style='text-align: center;'>Temporal Evolution of Brain States</h3>", unsafe_allow_html=True)
 
-                timeline_data = []
-                for i, state in enumerate(timeline):
-                    timeline_data.append({
-                        "State": state,
-                        "Start": i * 30,
-                        "End": (i + 1) * 30
-                    })
-                df_timeline = pd.DataFrame(timeline_data)
+                session_end = float((metadata.get("windows", 1) - 1) * hop_sec + window_sec)
+                start_sec, end_sec = st.slider("Time range (seconds)", 0.0, session_end, (0.0, session_end),
+                                               step=float(hop_sec))
+                # Only the segments and the downsampled points of the range are fetched, so zooming in refines the plot
+                view = get_view(digest, data, start_sec, end_sec)
 
+                # One bar per run of equal states rather than one per window
+                df_segments = pd.DataFrame(view["segments"])
+                df_segments["Duration"] = df_segments["end_sec"] - df_segments["start_sec"]
                 fig_timeline = px.bar(
-                    df_timeline,
-                    base="Start",
-                    x=[30] * len(df_timeline),
-                    y=[0] * len(df_timeline),
-                    color="State",
+                    df_segments,
+                    base="start_sec",
+                    x="Duration",
+                    y=[0] * len(df_segments),
+                    color="state",
                     orientation='h',
-                    text="State",
+                    text="state",
+                    hover_data={"windows": True, "start_sec": True, "end_sec": True},
+                    labels={"state": "State"},
                     color_discrete_map=STATE_COLORS # Apply constant colors
                 )
 
@@ -136,41 +207,49 @@ if uploaded_file:
                     height=150,
                     margin=dict(l=0, r=0, t=30, b=0),
                     xaxis_title="Time (seconds)",
+                    xaxis_range=[start_sec, end_sec],
                     yaxis=dict(visible=False), 
-                    barmode='stack'
+                    barmode='overlay',
+                    # Labels are dropped on segments too narrow to hold them
+                    uniformtext_minsize=10,
+                    uniformtext_mode='hide'
                 )
                 st.plotly_chart(fig_timeline, use_container_width=True)
 
                 # --- BOTTOM ROW: Score Evolution line chart ---
-                if scores_data:
+                if view["scores"]:
                     st.markdown("---")
                     st.markdown("<h3 style='text-align: center;'>Score Evolution</h3>", unsafe_allow_html=True)
-                    df_scores = pd.DataFrame(scores_data)
-                    df_scores["Window"] = [f"W{i+1}" for i in range(len(df_scores))]
-                    
-                    fig_scores = px.line(
-                        df_scores, 
-                        x="Window", 
-                        y=list(SCORE_COLORS.keys()),
-                        labels={"value": "Ratio vs Baseline", "variable": "Metric"},
-                        title="Cognitive State scores per 30s Window",
-                        markers=True,
-                        color_discrete_map=SCORE_COLORS
-                    )
+                    title = f"Cognitive State scores per {window_sec:g}s Window"
+                    if view["downsampled"]:
+                        title += f" ({view['windows_in_range']} windows, downsampled)"
+
+                    fig_scores = go.Figure()
+                    for key, color in SCORE_COLORS.items():
+                        series = view["scores"].get(key)
+                        if series:
+                            fig_scores.add_trace(go.Scattergl(x=series["t"], y=series["y"], name=key,
+                                                              mode="lines", line=dict(color=color)))
 
                     fig_scores.update_layout(
                         title={
-                            'text': "Cognitive State scores per 30s Window",
+                            'text': title,
                             'y': 0.9,
                             'x': 0.5,
                             'xanchor': 'center',
                             'yanchor': 'top'
                         },
+                        xaxis_title="Window start (seconds)",
+                        yaxis_title="Ratio vs Baseline",
+                        legend_title_text="Metric",
+                        xaxis_range=[start_sec, end_sec],
                         margin=dict(t=50, b=20, l=20, r=20)
                     )
 
                     fig_scores.add_hline(y=1.0, line_dash="dash", line_color="gray", annotation_text="Baseline")
                     st.plotly_chart(fig_scores, use_container_width=True)
+            else:
+                st.error(f"Backend error ({data.status_code}): {data.text}")
 
         except Exception as e:
             st.error(f"Could not connect to backend: {e}")
@@ -0,0 +1,79 @@
+"""
+Benchmark for the artifact screening step.
+Compares the original per-epoch/per-channel loop against the batched
+EEGProcessor.screen_artifacts on a synthetic (n_epochs, n_channels, n_samples) array.
+
+Usage: python benchmarks/bench_artifacts.py --epochs 1440 --channels 14
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from EEG_Processor import EEGProcessor
+
+
+def legacy_noisy_epoch_indices(data, channel_threshold_pct=0.3):
+    """The original loop from get_noisy_epoch_indices (without the print calls)."""
+    noisy_indices = []
+    n_epochs, n_channels, _ = data.shape
+    max_bad_channels = int(n_channels * channel_threshold_pct)
+    for epoch_idx in range(n_epochs):
+        num_bad = 0
+        for ch_idx in range(n_channels):
+            ch_data = data[epoch_idx, ch_idx, :]
+            ptp = np.ptp(ch_data)
+            ch_std = np.std(ch_data)
+            if ptp > 300e-6 or ch_std < 1e-7 or ch_std > 100e-6:
+                num_bad += 1
+        if num_bad > max_bad_channels:
+            noisy_indices.append(epoch_idx)
+    return noisy_indices
+
+
+def make_epochs(n_epochs, n_channels, n_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.standard_normal((n_epochs, n_channels, n_samples)) * 20e-6
+    # Inject some blinks, flatlines and EMG bursts so every branch is exercised
+    data[::7, : n_channels // 2, :50] += 500e-6
+    data[::11, :, :] *= 1e-4
+    data[::13, : n_channels // 2 + 1, :] *= 8
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--epochs", type=int, default=1440, help="Number of epochs (1440 = 12h of 30s windows)")
+    parser.add_argument("--channels", type=int, default=14)
+    parser.add_argument("--samples", type=int, default=7501)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_epochs(args.epochs, args.channels, args.samples)
+    ch_names = [f"EEG{i:03d}" for i in range(args.channels)]
+    processor = EEGProcessor()
+
+    def best_of(fn):
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - t0)
+        return min(times), out
+
+    t_loop, loop_idx = best_of(lambda: legacy_noisy_epoch_indices(data))
+    t_vec, report = best_of(lambda: processor.screen_artifacts(data, ch_names))
+    vec_idx = np.flatnonzero(report["noisy_epochs"]).tolist()
+
+    assert loop_idx == vec_idx, "Batched screening disagrees with the reference loop"
+    print(f"data shape: {data.shape}, rejected epochs: {len(vec_idx)}")
+    print(f"loop:    {t_loop * 1e3:9.1f} ms")
+    print(f"batched: {t_vec * 1e3:9.1f} ms")
+    print(f"speedup: {t_loop / t_vec:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Result cache benchmark: uploads the same synthetic CSV twice through /upload and then looks it up
+by hash through /results/{sha256}. The first upload is a miss (full pipeline), the second is a hit
+that only pays for the transfer + hashing, and the lookup skips the upload entirely.
+
+Usage: python benchmarks/bench_cache.py --mb 100
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+def make_csv(target_mb, sfreq=250, seed=0):
+    # ~270 bytes per row for 14 channels printed with the default float format
+    n = int(target_mb * 1e6 / 270)
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.standard_normal((n, len(CHANNELS))) * 10, columns=CHANNELS)
+    return df.to_csv(index=False).encode()
+
+
+async def run(app, payload):
+    import httpx
+    timings = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 timeout=None) as client:
+        for label in ("miss", "hit"):
+            t0 = time.perf_counter()
+            r = await client.post("/upload", files={"file": ("bench.csv", payload, "text/csv")})
+            timings[f"upload ({label})"] = time.perf_counter() - t0
+            assert r.status_code == 200, r.text
+
+        t0 = time.perf_counter()
+        digest = hashlib.sha256(payload).hexdigest()
+        timings["client sha256"] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        r = await client.get(f"/results/{digest}")
+        timings["lookup by hash"] = time.perf_counter() - t0
+        assert r.status_code == 200
+        stats = (await client.get("/cache/stats")).json()
+    return timings, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=100, help="Approximate CSV size in MB")
+    args = parser.parse_args()
+
+    import main as backend
+    payload = make_csv(args.mb)
+    print(f"payload: {len(payload) / 1e6:.1f} MB")
+    timings, stats = asyncio.run(run(backend.app, payload))
+    for name, seconds in timings.items():
+        print(f"{name:<16} {seconds * 1e3:10.1f} ms")
+    print(f"cache stats: {stats}")
+    backend.worker_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Filter engine benchmark: time of the filter stage and effect on the band powers for each
+EEGProcessor filter_method ("fir" = MNE reference, "fft" = cached kernel + scipy overlap-add,
+"iir" = zero-phase SOS Butterworth), on synthetic EEG.
+The band power columns are the largest relative difference to "fir" over all windows, on the
+channel averaged Welch PSD used by the classification.
+
+Usage: python benchmarks/bench_filters.py --minutes 60 --channels 14 --n-jobs 1
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from EEG_Processor import EEGProcessor
+from synthetic_eeg import SyntheticEEG
+
+
+def window_band_powers(processor, data, ch_names):
+    raw = processor._build_raw(data.copy(), ch_names)
+    step = int(processor.window_size * processor.sfreq)
+    filtered = raw.get_data()
+    n_windows = processor.expected_windows(filtered.shape[1])
+    windows = np.stack([filtered[:, w * step:w * step + step + 1] for w in range(n_windows)])
+    psd, freqs = processor._compute_psd(windows)
+    return processor._band_power_engine(psd.mean(axis=1), freqs)["bands"], processor.timer.stages["filter"]["wall_sec"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--channels", type=int, default=14)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args()
+
+    eeg = SyntheticEEG(args.channels, args.minutes * 60)
+    data = eeg.generate()
+    results = {}
+    for method in ("fir", "fft", "iir"):
+        processor = EEGProcessor(filter_method=method, n_jobs=args.n_jobs)
+        window_band_powers(processor, data[:, :20000], eeg.ch_names)  # Warm-up: kernel design, montage
+        results[method] = window_band_powers(processor, data, eeg.ch_names)
+
+    reference = results["fir"][0]
+    bands = list(EEGProcessor().bands)
+    print(f"{'method':<6} {'filter s':>9}  " + "  ".join(f"{b:>7}" for b in bands))
+    for method, (band_power, seconds) in results.items():
+        rel = np.abs(band_power / reference - 1).max(axis=0)
+        print(f"{method:<6} {seconds:9.3f}  " + "  ".join(f"{r:7.2%}" for r in rel))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Load time benchmark across the supported input formats.
+Writes the same synthetic recording as CSV, Parquet, Arrow/Feather, NPY and EDF into a temp dir
+and times read_recording (full load to a (n_channels, n_times) array) for each, plus a full
+chunked pass with iter_recording (the streaming path).
+
+--gb is the size of the float64 signal in memory; the CSV is roughly twice as large on disk.
+Usage: python benchmarks/bench_formats.py --gb 1.0 [--keep DIR]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from EEG_Readers import read_recording, iter_recording
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+def write_all(out_dir, gb, sfreq=250):
+    n = int(gb * 1e9 / (8 * len(CHANNELS)))
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((n, len(CHANNELS))) * 10, columns=CHANNELS)
+    df.insert(0, 'time', np.arange(n) / sfreq)
+
+    paths = {}
+    t0 = time.perf_counter()
+    paths['csv'] = os.path.join(out_dir, 'session.csv')
+    df.to_csv(paths['csv'], index=False)
+    try:
+        import pyarrow  # noqa: F401
+        paths['parquet'] = os.path.join(out_dir, 'session.parquet')
+        df.to_parquet(paths['parquet'])
+        paths['feather'] = os.path.join(out_dir, 'session.feather')
+        df.to_feather(paths['feather'], compression='uncompressed')
+    except ImportError:
+        print("pyarrow not installed, skipping Parquet/Feather")
+    paths['npy'] = os.path.join(out_dir, 'session.npy')
+    np.save(paths['npy'], df[CHANNELS].values)
+    try:
+        import mne
+        raw = mne.io.RawArray(df[CHANNELS].values.T * 1e-6, mne.create_info(CHANNELS, sfreq, 'eeg'), verbose=False)
+        paths['edf'] = os.path.join(out_dir, 'session.edf')
+        mne.export.export_raw(paths['edf'], raw, fmt='edf', verbose=False)
+    except ImportError:
+        print("edfio not installed, skipping EDF")
+    print(f"wrote {n} samples x {len(CHANNELS)} channels in {time.perf_counter() - t0:.1f}s")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gb", type=float, default=1.0)
+    parser.add_argument("--keep", default=None, help="Write the files here and keep them (default: temp dir)")
+    args = parser.parse_args()
+
+    out_dir = args.keep or tempfile.mkdtemp(prefix="eeg_formats_")
+    os.makedirs(out_dir, exist_ok=True)
+    paths = write_all(out_dir, args.gb)
+
+    print(f"\n{'format':<8} {'size MB':>9} {'full load s':>12} {'chunked s':>10}")
+    for fmt, path in paths.items():
+        t0 = time.perf_counter()
+        _, data, _ = read_recording(path)
+        # Memory mapped formats are lazy, so touch every sample (the pipeline's max-abs check does the same)
+        np.max(np.abs(data))
+        t_full = time.perf_counter() - t0
+        del data
+        t0 = time.perf_counter()
+        for _, block in iter_recording(path, chunk_rows=75000):
+            np.max(np.abs(block))
+        t_chunk = time.perf_counter() - t0
+        print(f"{fmt:<8} {os.path.getsize(path) / 1e6:>9.0f} {t_full:>12.2f} {t_chunk:>10.2f}")
+
+    if not args.keep:
+        for path in paths.values():
+            os.remove(path)
+        os.rmdir(out_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Peak memory of process_file in the default and the low memory mode, as a multiple of the
+float64 signal size (n_channels x n_times x 8 bytes), on a synthetic CSV recording.
+Each run happens in a fresh subprocess; the reported figure is the peak RSS during the run
+minus the RSS once the libraries are imported, so it is the memory the run itself needs.
+The low memory mode targets less than 2x the signal. With .npy input the RSS also counts the
+memory mapped file pages touched while reading (clean page cache the kernel can drop at any time).
+
+Usage: python benchmarks/bench_memory.py --minutes 30 --channels 64 [--format .npy]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_eeg import SyntheticEEG
+
+MODES = {
+    "default": {},
+    "low_memory": {"low_memory": True},
+    "low_memory_float32": {"low_memory": True, "buffer_dtype": "float32"},
+    "streaming": None,
+}
+
+CHILD = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+from EEG_Metrics import _peak_rss, _reset_peak_rss
+from EEG_Processor import EEGProcessor
+processor = EEGProcessor(**{kwargs!r})
+_reset_peak_rss()
+before = _peak_rss()
+start = time.perf_counter()
+result = processor.process_streaming({path!r}) if {streaming!r} else processor.process_file({path!r})
+print(json.dumps({{"wall_sec": time.perf_counter() - start, "peak_bytes": _peak_rss() - before,
+                  "windows": result["metadata"]["windows"]}}))
+"""
+
+
+def run_mode(path, mode):
+    kwargs = MODES[mode] or {}
+    code = CHILD.format(root=ROOT, kwargs=kwargs, path=path, streaming=MODES[mode] is None)
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=30)
+    parser.add_argument("--channels", type=int, default=64)
+    parser.add_argument("--format", choices=[".csv", ".npy"], default=".csv")
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    eeg = SyntheticEEG(args.channels, args.minutes * 60)
+    signal_bytes = eeg.n_channels * eeg.n_times * 8
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"recording{args.format}")
+        if args.format == ".csv":
+            eeg.write_csv(path)
+        else:
+            import numpy as np
+            np.save(path, eeg.generate().T)
+        print(f"{args.channels} channels x {args.minutes:g} min, signal {signal_bytes / 1e6:.0f} MB ({args.format})")
+        print(f"{'mode':<20} {'wall s':>8} {'peak MB':>8} {'x signal':>9}")
+        for mode in args.modes:
+            stats = run_mode(path, mode)
+            print(f"{mode:<20} {stats['wall_sec']:8.2f} {stats['peak_bytes'] / 1e6:8.0f} "
+                  f"{stats['peak_bytes'] / signal_bytes:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Spectral engine benchmark: time of the PSD of every window of a recording for each
+EEGProcessor psd_method ("mne" = psd_array_welch reference, "welch" = batched rfft,
+"multitaper" = DPSS multitaper) and each thread count, on synthetic EEG windows.
+The band power columns are the median and the largest relative difference to "mne" over all
+windows and bands, on the channel averaged PSD used by the classification (bandpassed data).
+
+Usage: python benchmarks/bench_psd.py --minutes 60 --channels 64 --n-jobs 1 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from EEG_Filters import bandpass
+from EEG_Processor import EEGProcessor
+from EEG_Spectral import PSD_METHODS
+from synthetic_eeg import SyntheticEEG
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--channels", type=int, default=64)
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=[1])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    eeg = SyntheticEEG(args.channels, args.minutes * 60)
+    data = bandpass(eeg.generate() * 1e-6, 250, 0.5, 45.0, "fft")
+    step = 7500
+    n_windows = EEGProcessor().expected_windows(data.shape[1])
+    # The strided window views the processor hands to the engine
+    windows = np.lib.stride_tricks.sliding_window_view(data, step + 1, axis=1)[:, :n_windows * step:step]
+    windows = windows.transpose(1, 0, 2)
+    print(f"{n_windows} windows x {args.channels} channels")
+
+    reference = None
+    print(f"{'method':<11} {'n_jobs':>6} {'psd s':>8} {'median diff':>12} {'max diff':>9}")
+    for method in PSD_METHODS:
+        for n_jobs in ([1] if method == "mne" else args.n_jobs):
+            processor = EEGProcessor(psd_method=method, n_jobs=n_jobs)
+            seconds, (psd, freqs) = best_of(lambda: processor._compute_psd(windows), args.repeats)
+            bands = processor._band_power_engine(psd.mean(axis=1), freqs)["bands"]
+            reference = bands if reference is None else reference
+            diff = np.abs(bands / reference - 1)
+            print(f"{method:<11} {n_jobs:6d} {seconds:8.3f} {np.median(diff):12.2%} {diff.max():9.2%}")
+
+
+if __name__ == "__main__":
+    main()
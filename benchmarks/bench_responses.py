@@ -0,0 +1,84 @@
+"""
+Response format benchmark: encode time on the server, body size (raw and gzip compressed, as
+sent with Content-Encoding: gzip) and the client side time to get a per-window DataFrame, for
+every EEG_Formats format. The result is a realistic one built by EEGProcessor._aggregate_results
+for a recording of --hours hours with a window every --hop seconds.
+
+Usage: python benchmarks/bench_responses.py --hours 12 --hop 2
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import EEG_Formats
+from EEG_Processor import EEGProcessor, SCORE_KEYS, STATE_LABELS
+
+
+def make_result(n_windows, hop, seed=0):
+    processor = EEGProcessor(hop=hop)
+    rng = np.random.default_rng(seed)
+    # States come in runs, like a real timeline
+    codes = np.repeat(rng.integers(0, len(STATE_LABELS), n_windows // 5 + 1), 5)[:n_windows]
+    scores = rng.lognormal(0, 0.3, (n_windows, len(SCORE_KEYS)))
+    return processor._aggregate_results(codes, scores)
+
+
+def to_frame(payload, fmt):
+    """What the dashboard does with a response: one row per window with the state and the scores."""
+    if fmt == "json":
+        data = json.loads(payload)
+        df = pd.DataFrame(data["scores"])
+        df["state"] = data["timeline"]
+        return df
+    if fmt == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_stream(payload).read_all().to_pandas()
+    data = EEG_Formats.decode(payload, fmt)
+    df = pd.DataFrame(data["scores"])
+    df["state"] = pd.Categorical.from_codes(data["states"], categories=data["state_legend"])
+    return df
+
+
+def best_of(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=12)
+    parser.add_argument("--hop", type=float, default=2)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    n_windows = int(args.hours * 3600 / args.hop)
+    result = make_result(n_windows, args.hop)
+    print(f"{n_windows} windows ({args.hours:g} h, hop {args.hop:g} s)")
+    print(f"{'format':<10} {'encode ms':>10} {'KB':>9} {'gzip KB':>9} {'to DataFrame ms':>16}")
+    base = None
+    for fmt in EEG_Formats.FORMATS:
+        if not EEG_Formats.available(fmt):
+            print(f"{fmt:<10} not installed")
+            continue
+        encode_sec, payload = best_of(lambda: EEG_Formats.encode(result, fmt), args.repeats)
+        decode_sec, df = best_of(lambda: to_frame(payload, fmt), args.repeats)
+        assert len(df) == n_windows
+        size, gz = len(payload), len(gzip.compress(payload, 6))
+        base = base or size
+        print(f"{fmt:<10} {encode_sec * 1e3:10.1f} {size / 1e3:9.0f} {gz / 1e3:9.0f} {decode_sec * 1e3:16.1f}"
+              f"   ({size / base:.0%} of json)")
+
+
+if __name__ == "__main__":
+    main()
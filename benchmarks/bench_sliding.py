@@ -0,0 +1,59 @@
+"""
+Overlapping windows benchmark: the PSD stage for 30s windows every --hop seconds, computed
+the naive way (overlapping mne.Epochs + compute_psd, every window's segments recomputed) and
+with the shared segment engine (EEGProcessor._sliding_psd), next to the non overlapping base pass.
+
+Usage: python benchmarks/bench_sliding.py --minutes 60 --hop 2
+"""
+import argparse
+import os
+import sys
+import time
+
+import mne
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from EEG_Processor import EEGProcessor
+from synthetic_eeg import SyntheticEEG
+
+
+def naive_psd(raw, window_size, hop):
+    events = mne.make_fixed_length_events(raw, duration=window_size, overlap=window_size - hop)
+    epochs = mne.Epochs(raw, events, tmin=0, tmax=window_size, baseline=None, preload=True, verbose=False)
+    return epochs.compute_psd(method='welch', fmin=.5, fmax=45, verbose=False).get_data().mean(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--channels", type=int, default=14)
+    parser.add_argument("--hop", type=float, default=2)
+    args = parser.parse_args()
+
+    eeg = SyntheticEEG(args.channels, args.minutes * 60)
+    base = EEGProcessor()
+    raw = base._build_raw(eeg.generate(), eeg.ch_names)
+    data = raw.get_data()
+
+    timings = {}
+    t0 = time.perf_counter()
+    n_base = len(naive_psd(raw, base.window_size, base.window_size))
+    timings[f"base pass ({n_base} windows)"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    n_naive = len(naive_psd(raw, base.window_size, args.hop))
+    timings[f"naive overlap ({n_naive} windows)"] = time.perf_counter() - t0
+
+    sliding = EEGProcessor(hop=args.hop)
+    step, hop = int(base.window_size * base.sfreq), int(round(args.hop * base.sfreq))
+    t0 = time.perf_counter()
+    spectra, _ = sliding._sliding_psd(data, step + 1, hop, sliding.expected_windows(data.shape[1]))
+    timings[f"shared segments ({len(spectra)} windows)"] = time.perf_counter() - t0
+
+    for name, seconds in timings.items():
+        print(f"{name:<36} {seconds:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+API cold start benchmark: in a fresh interpreter per run, the time from the start of the import
+of main to the import being done, the first /health response, /ready turning 200 (processing
+modules imported, montages/filter kernel/PSD window built, worker processes started) and the
+first /upload response of a short recording, either sent right away (it waits for the warm-up)
+or once /ready says so. Requests go through the in-process TestClient, so uvicorn's own startup
+is not included. Times are the medians over --runs, in seconds since the import started.
+
+Usage: python benchmarks/bench_startup.py --runs 5 --workers 1
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_eeg import SyntheticEEG
+
+
+def child(csv_path, wait_ready):
+    """One cold start, in this (fresh) process. Prints the timings as JSON."""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import main
+    times = {"import": time.perf_counter() - started}
+    from fastapi.testclient import TestClient
+
+    with open(csv_path, "rb") as f:
+        data = f.read()
+    with TestClient(main.app) as client:
+        client.get("/health")
+        times["health"] = time.perf_counter() - started
+        if wait_ready:
+            while client.get("/ready").status_code != 200:
+                time.sleep(0.005)
+            times["ready"] = time.perf_counter() - started
+        response = client.post("/upload", files={"file": ("session.csv", data, "text/csv")})
+        assert response.status_code == 200, response.text
+        times["upload"] = time.perf_counter() - started
+    print(json.dumps(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="EEG_WORKERS of the app")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--wait-ready", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.wait_ready)
+        return
+
+    env = {**os.environ, "EEG_WORKERS": str(args.workers)}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = SyntheticEEG(14, 65, seed=0).write_csv(os.path.join(tmp, "session.csv"))
+        print(f"{'first upload':<22} {'import':>7} {'health':>7} {'ready':>7} {'upload':>7}")
+        for wait_ready in (False, True):
+            runs = []
+            for _ in range(args.runs):
+                command = [sys.executable, os.path.abspath(__file__), "--child", csv_path]
+                out = subprocess.run(command + ["--wait-ready"] * wait_ready, env=env, capture_output=True,
+                                     text=True, check=True).stdout
+                runs.append(json.loads(out.strip().splitlines()[-1]))
+            median = {k: np.median([run[k] for run in runs]) for k in runs[0]}
+            ready = f"{median['ready']:7.2f}" if wait_ready else f"{'-':>7}"
+            label = "once /ready is 200" if wait_ready else "sent right away"
+            print(f"{label:<22} {median['import']:7.2f} {median['health']:7.2f} {ready} {median['upload']:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
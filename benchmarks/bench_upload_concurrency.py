@@ -0,0 +1,103 @@
+"""
+Throughput benchmark for POST /upload under concurrent uploads.
+The app is driven in-process through httpx's ASGI transport, so the numbers reflect the
+server side only (no network). For each concurrency level it reports wall time, files/s,
+how many requests were refused with 429, and the worst event loop lag seen while the
+uploads were in flight (a blocked loop shows up as a lag close to the processing time).
+The sequential in-process run of process_csv is the pre-pool reference.
+
+Usage: python benchmarks/bench_upload_concurrency.py --minutes 10 --uploads 16 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+def make_csv(minutes, sfreq=250, seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(minutes * 60 * sfreq)
+    df = pd.DataFrame(rng.standard_normal((n, len(CHANNELS))) * 10, columns=CHANNELS)
+    return df.to_csv(index=False).encode()
+
+
+async def loop_lag_monitor(stop, interval=0.01):
+    worst = 0.0
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - t0 - interval)
+    return worst
+
+
+async def run_level(app, payload, uploads, concurrency):
+    import httpx
+    sem = asyncio.Semaphore(concurrency)
+    statuses = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 timeout=None) as client:
+        async def one():
+            async with sem:
+                r = await client.post("/upload", files={"file": ("bench.csv", payload, "text/csv")})
+                statuses.append(r.status_code)
+
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(loop_lag_monitor(stop))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(uploads)))
+        wall = time.perf_counter() - t0
+        stop.set()
+        lag = await monitor
+    return wall, statuses, lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10, help="Recording length of each upload")
+    parser.add_argument("--uploads", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-queue", type=int, default=None)
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma separated client concurrency levels")
+    args = parser.parse_args()
+
+    os.environ["EEG_WORKERS"] = str(args.workers)
+    if args.max_queue is not None:
+        os.environ["EEG_MAX_QUEUE"] = str(args.max_queue)
+    import main as backend
+    from EEG_Processor import EEGProcessor
+
+    payload = make_csv(args.minutes)
+    print(f"payload: {len(payload) / 1e6:.1f} MB ({args.minutes} min), workers: {backend.worker_pool.max_workers}, "
+          f"queue: {backend.worker_pool.max_queue}")
+
+    # Reference: the old behaviour, every file processed one after the other on the request thread
+    with tempfile.NamedTemporaryFile(suffix=".csv") as f:
+        f.write(payload)
+        f.flush()
+        n_ref = min(args.uploads, 4)
+        t0 = time.perf_counter()
+        for _ in range(n_ref):
+            EEGProcessor(**backend.PROCESSOR_CONFIG).process_csv(f.name)
+        per_file = (time.perf_counter() - t0) / n_ref
+    print(f"sequential reference: {per_file:.2f} s/file, {1 / per_file:.2f} files/s\n")
+
+    print(f"{'concurrency':>11} {'wall s':>8} {'files/s':>8} {'ok':>4} {'429':>4} {'max loop lag ms':>16}")
+    for level in [int(x) for x in args.levels.split(",")]:
+        wall, statuses, lag = asyncio.run(run_level(backend.app, payload, args.uploads, level))
+        ok = statuses.count(200)
+        print(f"{level:>11} {wall:>8.2f} {ok / wall:>8.2f} {ok:>4} {statuses.count(429):>4} {lag * 1e3:>16.1f}")
+    backend.worker_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Reproducible performance regression suite.
+
+Runs each benchmark target over a grid of recording durations and channel counts on synthetic
+EEG (benchmarks/synthetic_eeg.py, fixed seeds), writes the results as JSON and, given a
+baseline results file, fails when any case got slower than the configured threshold.
+
+Targets:
+    process_csv        EEGProcessor.process_csv on a CSV file (stage breakdown included)
+    prepare_raw        EEGProcessor._prepare_raw_data on a loaded DataFrame (scale, montage, filter, reference)
+    noisy_epochs       EEGProcessor.get_noisy_epoch_indices on preloaded epochs
+    process_streaming  EEGProcessor.process_streaming on a CSV file (bounded memory, for the long cases)
+    upload             POST /upload in-process through the ASGI app, result cache disabled
+
+Profiles (durations x channel counts):
+    smoke  3 min x 14 ch (seconds, for CI)
+    quick  3 min, 30 min, 2 h x 14, 64 ch
+    full   3 min, 30 min, 2 h, 12 h x 14, 32, 64, 128, 256 ch
+Cases whose estimated memory (or CSV size on disk) exceeds --max-gb are recorded as skipped.
+Generated CSVs are kept in --data-dir and reused by later runs.
+
+Usage:
+    python benchmarks/run_suite.py --profile quick --out results.json
+    python benchmarks/run_suite.py --profile quick --out new.json --baseline results.json --threshold 0.2
+Exit code 1 when a regression is found.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import numpy as np
+import pandas as pd
+import mne
+
+from EEG_Metrics import StageTimer
+from EEG_Processor import EEGProcessor
+from synthetic_eeg import SyntheticEEG
+
+SUITE_VERSION = 1
+PROFILES = {
+    "smoke": {"durations": [180], "channels": [14]},
+    "quick": {"durations": [180, 1800, 7200], "channels": [14, 64]},
+    "full": {"durations": [180, 1800, 7200, 43200], "channels": [14, 32, 64, 128, 256]},
+}
+TARGETS = ["process_csv", "prepare_raw", "noisy_epochs", "process_streaming", "upload"]
+# Rough peak memory of each target as a multiple of the float64 signal size
+MEMORY_FACTOR = {"process_csv": 6, "prepare_raw": 5, "noisy_epochs": 4, "process_streaming": 0, "upload": 6}
+CSV_BYTES_PER_VALUE = 9  # '%.4f' values plus the separator
+GENERATOR_KWARGS = {"blinks_per_min": 10, "flatlines": 2, "emg_bursts": 4}
+
+
+def case_name(target, n_channels, duration_sec):
+    return f"{target}/{n_channels}ch/{duration_sec}s"
+
+
+def recording_csv(data_dir, n_channels, duration_sec, sfreq):
+    """Synthetic CSV for the case, generated once and reused across runs."""
+    path = os.path.join(data_dir, f"synthetic_{n_channels}ch_{duration_sec}s_{sfreq}hz_v{SUITE_VERSION}.csv")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp"
+        SyntheticEEG(n_channels, duration_sec, sfreq, **GENERATOR_KWARGS).write_csv(tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def setup_case(target, csv_path, sfreq):
+    """Returns fn() running one iteration of the target; the untimed preparation happens here."""
+    processor = EEGProcessor(sfreq=sfreq, report_timings=True)
+    if target == "process_csv":
+        return lambda: processor.process_csv(csv_path)
+    if target == "process_streaming":
+        return lambda: processor.process_streaming(csv_path)
+    if target == "prepare_raw":
+        df = pd.read_csv(csv_path)
+        return lambda: processor._prepare_raw_data(df)
+    if target == "noisy_epochs":
+        raw = processor._prepare_raw_data(pd.read_csv(csv_path))
+        events = mne.make_fixed_length_events(raw, duration=processor.window_size)
+        epochs = mne.Epochs(raw, events, tmin=0, tmax=processor.window_size,
+                            baseline=None, preload=True, verbose=False)
+        return lambda: processor.get_noisy_epoch_indices(epochs)
+    if target == "upload":
+        return _upload_runner(csv_path)
+    raise ValueError(f"Unknown target {target}")
+
+
+def _upload_runner(csv_path):
+    import httpx
+    import main as backend
+    # Every iteration must run the pipeline, so the result cache never keeps anything
+    backend.result_cache = backend.ResultCache(max_entries=0)
+    with open(csv_path, "rb") as f:
+        payload = f.read()
+
+    async def post():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=backend.app), base_url="http://bench",
+                                     timeout=None) as client:
+            r = await client.post("/upload", files={"file": ("bench.csv", payload, "text/csv")})
+            assert r.status_code == 200, r.text
+            return r.json()
+    return lambda: asyncio.run(post())
+
+
+def run_case(target, n_channels, duration_sec, sfreq, repeats, data_dir):
+    csv_path = recording_csv(data_dir, n_channels, duration_sec, sfreq)
+    fn = setup_case(target, csv_path, sfreq)
+    fn()  # Warm-up: imports, worker pool start, page cache
+    walls, cpus, peaks, stages = [], [], [], None
+    for _ in range(repeats):
+        timer = StageTimer()
+        with timer.stage(target):
+            result = fn()
+        record = timer.stages[target]
+        walls.append(record["wall_sec"])
+        cpus.append(record["cpu_sec"])
+        peaks.append(record["peak_bytes"])
+        if isinstance(result, dict) and "timings" in result.get("metadata", {}):
+            stages = {k: v["wall_sec"] for k, v in result["metadata"]["timings"]["stages"].items()}
+    median = statistics.median(walls)
+    return {
+        "median_wall_sec": median,
+        "min_wall_sec": min(walls),
+        "wall_sec": walls,
+        # The upload target runs in a worker process, so its CPU time isn't visible here
+        "median_cpu_sec": statistics.median(cpus),
+        "peak_rss_bytes": max(peaks) if None not in peaks else None,
+        "samples_per_sec": duration_sec * sfreq / median,
+        "stages": stages,
+    }
+
+
+def skip_reason(target, n_channels, duration_sec, sfreq, max_gb):
+    signal_gb = n_channels * duration_sec * sfreq * 8 / 1e9
+    csv_gb = n_channels * duration_sec * sfreq * CSV_BYTES_PER_VALUE / 1e9
+    if signal_gb * MEMORY_FACTOR[target] > max_gb:
+        return f"estimated {signal_gb * MEMORY_FACTOR[target]:.1f} GB of memory > --max-gb {max_gb:g}"
+    if csv_gb > max_gb:
+        return f"CSV would be {csv_gb:.1f} GB > --max-gb {max_gb:g}"
+    return None
+
+
+def compare(results, baseline, threshold, min_delta=0.05):
+    """
+    Cases of results slower than in baseline by more than threshold (a fraction, 0.2 = 20%).
+    Differences under min_delta seconds are ignored, they are timer noise on the small cases.
+    Returns a list of (case, baseline_sec, new_sec, ratio).
+    """
+    base = {r["case"]: r for r in baseline["results"] if "median_wall_sec" in r}
+    regressions = []
+    for r in results["results"]:
+        old = base.get(r["case"])
+        if old is None or "median_wall_sec" not in r:
+            continue
+        new_sec, old_sec = r["median_wall_sec"], old["median_wall_sec"]
+        if new_sec > old_sec * (1 + threshold) and new_sec - old_sec > min_delta:
+            regressions.append((r["case"], old_sec, new_sec, new_sec / old_sec))
+    return regressions
+
+
+def environment():
+    import scipy
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "pandas": pd.__version__,
+        "mne": mne.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS)
+    parser.add_argument("--durations", nargs="+", type=int, help="Override the profile durations (seconds)")
+    parser.add_argument("--channels", nargs="+", type=int, help="Override the profile channel counts")
+    parser.add_argument("--sfreq", type=float, default=250)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-gb", type=float, default=8.0, help="Skip cases needing more memory or disk than this")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "eeg_bench_data"))
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs the baseline (0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore slowdowns under this many seconds")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    profile = PROFILES[args.profile]
+    durations = args.durations or profile["durations"]
+    channels = args.channels or profile["channels"]
+    results = {
+        "suite_version": SUITE_VERSION,
+        "profile": args.profile,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "environment": environment(),
+        "settings": {"sfreq": args.sfreq, "repeats": args.repeats, "generator": GENERATOR_KWARGS},
+        "results": [],
+    }
+
+    print(f"{'case':<36} {'median s':>9} {'min s':>8} {'peak MB':>8} {'Msamples/s':>11}")
+    for duration_sec in durations:
+        for n_channels in channels:
+            for target in args.targets:
+                case = case_name(target, n_channels, duration_sec)
+                entry = {"case": case, "target": target, "n_channels": n_channels,
+                         "duration_sec": duration_sec, "sfreq": args.sfreq}
+                reason = skip_reason(target, n_channels, duration_sec, args.sfreq, args.max_gb)
+                if reason:
+                    entry["skipped"] = reason
+                    print(f"{case:<36} skipped: {reason}")
+                else:
+                    entry.update(run_case(target, n_channels, duration_sec, args.sfreq, args.repeats, args.data_dir))
+                    peak = f"{entry['peak_rss_bytes'] / 1e6:8.0f}" if entry["peak_rss_bytes"] else f"{'-':>8}"
+                    print(f"{case:<36} {entry['median_wall_sec']:9.3f} {entry['min_wall_sec']:8.3f} {peak} "
+                          f"{entry['samples_per_sec'] / 1e6:11.2f}")
+                results["results"].append(entry)
+                # Written after every case so a long run that dies still leaves its results behind
+                with open(args.out, "w") as f:
+                    json.dump(results, f, indent=2)
+
+    if "upload" in args.targets:
+        import main as backend
+        backend.worker_pool.shutdown()
+    print(f"\nResults written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for case, old_sec, new_sec, ratio in regressions:
+                print(f"  {case:<36} {old_sec:.3f}s -> {new_sec:.3f}s  (x{ratio:.2f})")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Synthetic live headset for the /stream WebSocket endpoint.
+Generates a 14 channel signal (alpha/theta oscillations + noise, in microvolts), sends it in
+small binary frames paced like a real device and reports the end-to-end latency of every window,
+i.e. the time between sending the sample that completes a window and receiving its result.
+
+Usage (with the backend running: python main.py):
+    python benchmarks/stream_client.py --minutes 3 --frame-ms 40
+    python benchmarks/stream_client.py --minutes 30 --speed 0   # as fast as possible
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from websockets.sync.client import connect
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+def synthetic_frames(n_samples, frame_size, sfreq, seed=0):
+    """Yields (n_times, n_channels) float32 frames in microvolts."""
+    rng = np.random.default_rng(seed)
+    gains = rng.uniform(0.5, 2.0, len(CHANNELS))
+    for start in range(0, n_samples, frame_size):
+        t = np.arange(start, min(start + frame_size, n_samples)) / sfreq
+        # Slowly drifting alpha/theta balance so the states change over the session
+        alpha = 20 * (1 + np.sin(2 * np.pi * t / 120))[:, None] * np.sin(2 * np.pi * 10 * t)[:, None]
+        theta = 15 * (1 + np.cos(2 * np.pi * t / 90))[:, None] * np.sin(2 * np.pi * 6 * t)[:, None]
+        noise = rng.standard_normal((len(t), len(CHANNELS))) * 10
+        yield ((alpha + theta) * gains + noise).astype('<f4')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8000/stream")
+    parser.add_argument("--minutes", type=float, default=3)
+    parser.add_argument("--sfreq", type=int, default=250)
+    parser.add_argument("--frame-ms", type=float, default=40, help="Frame duration sent per message")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed (1 = real time, 0 = no pacing)")
+    args = parser.parse_args()
+
+    n_samples = int(args.minutes * 60 * args.sfreq)
+    frame_size = max(1, int(args.sfreq * args.frame_ms / 1000))
+    sent_at = {}  # cumulative samples sent -> send time
+    latencies = []
+
+    with connect(args.url, max_size=None) as ws:
+        ws.send(json.dumps({"channels": CHANNELS, "units": "uV"}))
+        ready = json.loads(ws.recv())
+        print(f"Connected: {ready}")
+
+        def drain(timeout):
+            while True:
+                try:
+                    msg = json.loads(ws.recv(timeout=timeout))
+                except TimeoutError:
+                    return
+                if msg["type"] == "window":
+                    latency = time.perf_counter() - sent_at[msg["samples_received"]]
+                    latencies.append(latency)
+                    print(f"window {msg['window']:4d} @ {msg['start_sec']:6d}s  {msg['state']:<17} "
+                          f"latency {latency * 1e3:7.1f} ms")
+                elif msg["type"] in ("end", "error"):
+                    print(msg)
+                    return msg
+
+        t_start = time.perf_counter()
+        n_sent = 0
+        for frame in synthetic_frames(n_samples, frame_size, args.sfreq):
+            if args.speed > 0:
+                target = t_start + n_sent / args.sfreq / args.speed
+                time.sleep(max(0.0, target - time.perf_counter()))
+            ws.send(frame.tobytes())
+            n_sent += len(frame)
+            sent_at[n_sent] = time.perf_counter()
+            drain(0)
+        ws.send(json.dumps({"type": "end"}))
+        drain(None)
+
+    if latencies:
+        lat = np.array(latencies) * 1e3
+        print(f"\n{len(lat)} windows, latency ms: median {np.median(lat):.1f}, "
+              f"p95 {np.percentile(lat, 95):.1f}, max {lat.max():.1f}")
+
+
+if __name__ == "__main__":
+    main()
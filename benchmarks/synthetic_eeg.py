@@ -0,0 +1,170 @@
+"""
+Reproducible synthetic multi-channel EEG for the benchmarks and tests.
+
+The background is 1/f-like noise (AR(1) filtered white noise) plus a posterior alpha rhythm,
+in microvolts like the headset CSV exports. On top of it the usual artifacts can be injected:
+    blinks: ~300 ms monophasic deflections on the frontal channels
+    flatlines: stretches where a fraction of the channels (all of them by default, i.e. a
+               headset dropout) read a constant value
+    EMG bursts: 20-100Hz noise bursts on the temporal/frontal channels
+Every injected artifact is listed in .events (type, start/stop sample, channel indices) so
+tests can check what the pipeline detects. The signal is generated in fixed 10 s blocks from
+a seeded RNG, so the same parameters always give the same samples, whether the recording
+is built in memory or streamed to disk block by block.
+
+    eeg = SyntheticEEG(n_channels=64, duration_sec=3600, blinks_per_min=10)
+    eeg.write_csv("session.csv")   # bounded memory, any duration
+    df = eeg.to_frame()            # whole recording in memory
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.signal import butter, lfilter, sosfilt
+
+EMOTIV_CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+BLOCK_SEC = 10
+
+
+def channel_names(n_channels):
+    """
+    Emotiv EPOC names up to 14 channels, otherwise names spread evenly over the 10-20 system
+    (10-05 beyond 94 channels) so every scalp region is represented, then generic names.
+    """
+    if n_channels <= len(EMOTIV_CHANNELS):
+        return EMOTIV_CHANNELS[:n_channels]
+    import mne
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        system = 'standard_1020' if n_channels <= 94 else 'standard_1005'
+        pool = mne.channels.make_standard_montage(system).ch_names
+    if n_channels > len(pool):
+        return pool + [f"EEG{i:03d}" for i in range(n_channels - len(pool))]
+    return [pool[i] for i in np.linspace(0, len(pool) - 1, n_channels).round().astype(int)]
+
+
+def _region_channels(names, prefixes, fallback):
+    """Indices of the channels whose name starts with one of the prefixes (case insensitive)."""
+    picks = [i for i, name in enumerate(names) if name.upper().startswith(prefixes)]
+    return np.array(picks if picks else fallback, dtype=int)
+
+
+class SyntheticEEG:
+    def __init__(self, n_channels=14, duration_sec=180, sfreq=250, seed=0,
+                 noise_uv=10.0, alpha_uv=8.0,
+                 blinks_per_min=6.0, blink_uv=250.0,
+                 flatlines=0, flatline_sec=20.0, flatline_channel_frac=1.0,
+                 emg_bursts=0, emg_sec=3.0, emg_uv=60.0,
+                 ch_names=None):
+        self.ch_names = list(ch_names) if ch_names is not None else channel_names(n_channels)
+        self.n_channels = len(self.ch_names)
+        self.sfreq = sfreq
+        self.n_times = int(round(duration_sec * sfreq))
+        self.seed = seed
+        self.noise_uv = noise_uv
+        self.alpha_uv = alpha_uv
+        self.blink_uv = blink_uv
+        self.emg_uv = emg_uv
+
+        n_ch = self.n_channels
+        self.frontal = _region_channels(self.ch_names, ('FP', 'AF', 'F'), np.arange(max(1, n_ch // 4)))
+        self.occipital = _region_channels(self.ch_names, ('O', 'PO', 'P'), np.arange(n_ch - max(1, n_ch // 4), n_ch))
+        self.muscle = _region_channels(self.ch_names, ('T', 'FT', 'F7', 'F8', 'AF'), np.arange(n_ch // 2))
+
+        # Artifact schedule, drawn up front from its own RNG so it doesn't depend on the block size
+        rng = np.random.default_rng([seed, 1])
+        self.events = []
+        n_blinks = int(round(blinks_per_min * duration_sec / 60))
+        blink_len = int(0.3 * sfreq)
+        for start in np.sort(rng.integers(0, max(1, self.n_times - blink_len), n_blinks)):
+            self.events.append({"type": "blink", "start": int(start), "stop": int(start) + blink_len,
+                                "channels": self.frontal.tolist()})
+        for _ in range(flatlines):
+            length = int(flatline_sec * sfreq)
+            start = int(rng.integers(0, max(1, self.n_times - length)))
+            n_flat = max(1, int(round(flatline_channel_frac * n_ch)))
+            channels = np.sort(rng.choice(n_ch, n_flat, replace=False))
+            self.events.append({"type": "flatline", "start": start, "stop": start + length,
+                                "channels": channels.tolist()})
+        for _ in range(emg_bursts):
+            length = int(emg_sec * sfreq)
+            start = int(rng.integers(0, max(1, self.n_times - length)))
+            self.events.append({"type": "emg", "start": start, "stop": start + length,
+                                "channels": self.muscle.tolist()})
+
+        self._blink_shape = np.hanning(blink_len)
+        self._emg_sos = butter(4, [20, min(100, 0.45 * sfreq)], btype='bandpass', fs=sfreq, output='sos')
+        self._ar = 0.98
+
+    def iter_blocks(self):
+        """Yields (start_sample, block) with blocks of BLOCK_SEC seconds, shaped (n_channels, n_times), in µV."""
+        rng = np.random.default_rng([self.seed, 0])
+        block_len = int(BLOCK_SEC * self.sfreq)
+        a = self._ar
+        zi = rng.standard_normal((self.n_channels, 1)) * (self.noise_uv * a)
+        alpha_freq = 9.5 + rng.random(self.n_channels)
+        alpha_phase = rng.random(self.n_channels) * 2 * np.pi
+        alpha_gain = np.full(self.n_channels, 0.3)
+        alpha_gain[self.occipital] = 1.0
+        # Flatlines go last: a disconnected electrode reads a constant whatever else happens
+        events = sorted(self.events, key=lambda e: e["type"] == "flatline")
+        starts = np.array([e["start"] for e in events], dtype=np.int64)
+        stops = np.array([e["stop"] for e in events], dtype=np.int64)
+
+        for start in range(0, self.n_times, block_len):
+            stop = min(start + block_len, self.n_times)
+            n = stop - start
+            # 1/f-like background with std noise_uv, continuous across blocks through the filter state
+            white = rng.standard_normal((self.n_channels, n)) * (self.noise_uv * np.sqrt(1 - a * a))
+            block, zi = lfilter([1.0], [1.0, -a], white, axis=1, zi=zi)
+            t = np.arange(start, stop) / self.sfreq
+            block += (self.alpha_uv * alpha_gain)[:, None] * np.sin(
+                2 * np.pi * alpha_freq[:, None] * t + alpha_phase[:, None])
+            self._inject(block, start, stop, rng, events, starts, stops)
+            yield start, block
+
+    def _inject(self, block, start, stop, rng, events, starts, stops):
+        for i in np.flatnonzero((starts < stop) & (stops > start)):
+            event = events[i]
+            lo, hi = max(event["start"], start), min(event["stop"], stop)
+            channels = event["channels"]
+            seg = slice(lo - start, hi - start)
+            if event["type"] == "blink":
+                shape = self._blink_shape[lo - event["start"]:hi - event["start"]]
+                block[channels, seg] += self.blink_uv * shape
+            elif event["type"] == "flatline":
+                block[channels, seg] = 0.0
+            elif event["type"] == "emg":
+                noise = sosfilt(self._emg_sos, rng.standard_normal((len(channels), hi - lo + 200)), axis=1)[:, 200:]
+                block[channels, seg] += noise * (self.emg_uv / noise.std())
+
+    def generate(self):
+        """The whole recording as a (n_channels, n_times) array in µV."""
+        out = np.empty((self.n_channels, self.n_times))
+        for start, block in self.iter_blocks():
+            out[:, start:start + block.shape[1]] = block
+        return out
+
+    def to_frame(self):
+        """The whole recording in the CSV layout: a time column plus one column per channel."""
+        df = pd.DataFrame(self.generate().T, columns=self.ch_names)
+        df.insert(0, 'time', np.arange(self.n_times) / self.sfreq)
+        return df
+
+    def write_csv(self, path, float_format='%.4f'):
+        """Writes the CSV block by block, so memory stays bounded for any duration."""
+        with open(path, 'w', newline='') as f:
+            for start, block in self.iter_blocks():
+                df = pd.DataFrame(block.T, columns=self.ch_names)
+                df.insert(0, 'time', np.arange(start, start + block.shape[1]) / self.sfreq)
+                df.to_csv(f, header=start == 0, index=False, float_format=float_format)
+        return path
+
+    def window_truth(self, window_size=30):
+        """Artifact types present in each window of window_size seconds, e.g. [{"blink"}, set(), ...]."""
+        step = int(window_size * self.sfreq)
+        truth = [set() for _ in range(max(0, (self.n_times - 1) // step))]
+        for event in self.events:
+            for w in range(event["start"] // step, min(len(truth), (event["stop"] - 1) // step + 1)):
+                truth[w].add(event["type"])
+        return truth
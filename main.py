@@ -1,25 +1,436 @@
-
-from fastapi import FastAPI, UploadFile, File
-from EEG_Processor import EEGProcessor
-import shutil
+import time
+# Start of the import, for the startup time reported by /ready
+IMPORT_STARTED = time.perf_counter()
+from contextlib import asynccontextmanager
+from functools import lru_cache
+import asyncio
+from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
+from EEG_Workers import WorkerPool, PoolSaturated, process_file, warm_up
+from EEG_Jobs import JobStore, process_job, spool_upload
+from EEG_Cache import ResultCache, cache_key
+from EEG_Baselines import BaselineStore
+from EEG_Metrics import StageMetrics
+import EEG_Formats
+from EEG_Timeline import DOWNSAMPLING_METHODS, result_view
+import numpy as np
+import json
 import os
 
-app = FastAPI()
 # I am hardcoding this sampling rate for this particular dataset, but can be made flexible
-processor = EEGProcessor(sfreq=250) 
+# The bandpass implementation and its threads per worker come from EEG_FILTER_METHOD / EEG_FILTER_JOBS,
+# EEG_PSD_METHOD selects the window PSD estimator (mne, welch or multitaper, see EEG_Spectral),
+# EEG_ARTIFACT_METHOD=adaptive screens artifacts against per channel running statistics (see EEG_Artifacts),
+# EEG_LOW_MEMORY=1 processes uploads in the in place low memory mode (EEG_BUFFER_DTYPE float64 or float32)
+PROCESSOR_CONFIG = {
+    "sfreq": 250,
+    "filter_method": os.environ.get("EEG_FILTER_METHOD", "fir"),
+    "n_jobs": int(os.environ.get("EEG_FILTER_JOBS", 1)),
+    "psd_method": os.environ.get("EEG_PSD_METHOD", "mne"),
+    "artifact_method": os.environ.get("EEG_ARTIFACT_METHOD", "fixed"),
+    "low_memory": os.environ.get("EEG_LOW_MEMORY", "0") == "1",
+    "buffer_dtype": os.environ.get("EEG_BUFFER_DTYPE", "float64")
+}
+# The workers always report their stage timings; they are recorded for /metrics and only returned on request
+WORKER_CONFIG = {**PROCESSOR_CONFIG, "report_timings": True}
+# Uploads are processed in worker processes, sized by EEG_WORKERS / EEG_MAX_QUEUE, each warmed up when it starts
+worker_pool = WorkerPool.from_env(initializer=warm_up, initargs=(WORKER_CONFIG,))
+# Finished jobs are kept for EEG_JOB_TTL_SEC seconds, at most EEG_JOB_STORE_SIZE of them
+job_store = JobStore.from_env()
+_job_tasks = set()
+# Results keyed by file hash + processor config (EEG_CACHE_SIZE, EEG_CACHE_DIR, EEG_CACHE_MAX_BYTES)
+result_cache = ResultCache.from_env()
+# Per subject baselines in the SQLite file EEG_BASELINE_DB (uploads with a subject_id need it)
+baseline_store = BaselineStore.from_env()
+# Per-stage wall/CPU time and peak memory of every processed recording, served by GET /metrics
+stage_metrics = StageMetrics()
+# Startup state served by /ready, filled in by _warm_up
+readiness = {"ready": False, "error": None, "warmup_sec": None, "startup_sec": None}
+_warm_up_task = None
+
+
+@lru_cache(maxsize=1)
+def get_processor():
+    """
+    The API's EEGProcessor. EEG_Processor pulls in mne, scipy and pandas (most of the startup time), so it is
+    only imported here, by the warm-up or the first request that needs it.
+    """
+    from EEG_Processor import EEGProcessor
+    return EEGProcessor(**PROCESSOR_CONFIG)
+
+
+async def _warm_up():
+    """
+    Imports the processing stack and builds the cached montages, filter kernel and PSD window in a thread
+    (the server answers /health meanwhile), then starts the worker processes, which fork from the warmed
+    up process. /ready turns 200 once this is done.
+    """
+    readiness.update(ready=False, error=None)
+    started = time.perf_counter()
+    try:
+        processor = await run_in_threadpool(get_processor)
+        await run_in_threadpool(processor.warm_up)
+        await worker_pool.start()
+    except Exception as e:
+        readiness["error"] = f"{type(e).__name__}: {e}"
+        raise
+    now = time.perf_counter()
+    readiness.update(ready=True, warmup_sec=now - started, startup_sec=now - IMPORT_STARTED)
+
+
+async def _warmed_up():
+    """
+    Lets a request that needs the processor or the workers wait for the warm-up, if one is running: the
+    workers must not fork while another thread is importing (the child would inherit the held import locks).
+    """
+    if _warm_up_task is None:
+        return
+    try:
+        await asyncio.shield(_warm_up_task)
+    except Exception:
+        raise HTTPException(status_code=503, detail=f"Warm-up failed: {readiness['error']}")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _warm_up_task
+    _warm_up_task = asyncio.create_task(_warm_up())
+    yield
+    _warm_up_task.cancel()
+    _warm_up_task = None
+    worker_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/health")
+async def health():
+    """Liveness: the process serves requests (it may still be warming up, see /ready)."""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: 200 once the warm-up is done (processing modules imported, caches built, workers started),
+    with its duration and the time from the import of the app to ready; 503 before, or if it failed.
+    """
+    if not readiness["ready"]:
+        status = "failed" if readiness["error"] else "warming_up"
+        return JSONResponse({"status": status, "error": readiness["error"]}, status_code=503)
+    return {"status": "ready", "warmup_sec": readiness["warmup_sec"], "startup_sec": readiness["startup_sec"]}
 
 @app.post("/upload")
-async def upload_eeg(file: UploadFile = File(...)):
-    """ Function to upload the EEG data to the backend"""
-    temp_path = f"temp_{file.filename}"
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    try:
-        analysis = processor.process_csv(temp_path)
-        return analysis
+async def upload_eeg(request: Request, file: UploadFile = File(...), timings: bool = False, profile: bool = False,
+                     spatial: str = "", subject_id: str = None, fmt: str = Query(None, alias="format")):
+    """
+    Function to upload the EEG data to the backend.
+    spatial=regions,channels,... adds those levels of per region / per channel features (see EEGProcessor.spatial_levels).
+    subject_id=... scores the session against that subject's stored baseline and adds the session to it;
+    these results depend on the store, so they are never cached.
+    timings=true adds the per-stage timings to metadata["timings"] (cache hits have none).
+    profile=true always reprocesses the file under the sampling profiler and adds its report as metadata["profile"].
+    The response format is negotiated from the Accept header or format=json|columnar|arrow|msgpack, see EEG_Formats.
+    """
+    response_format = _response_format(request, fmt)
+    await _warmed_up()
+    worker_config, config = _request_config(spatial, subject_id)
+    temp_path, digest = await spool_upload(file)
+    try:
+        key = cache_key(digest, config)
+        cached = None if profile or subject_id else result_cache.get(key)
+        if cached is not None:
+            return _respond(cached, response_format)
+        analysis = await worker_pool.run(process_file, temp_path, worker_config, profile, subject_id)
+        diagnostics = _record_diagnostics(analysis)
+        if not subject_id:
+            result_cache.put(key, analysis)
+        return _respond(_with_diagnostics(analysis, diagnostics, timings=timings, profile=profile), response_format)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=429, detail=f"Server busy: {e}", headers={"Retry-After": "5"})
     finally:
         os.remove(temp_path)
 
+
+@app.post("/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...), timings: bool = False, spatial: str = "",
+                     subject_id: str = None):
+    """
+    Submits a recording for analysis and returns a job id right away.
+    Poll GET /jobs/{job_id} for the status and progress, then fetch GET /jobs/{job_id}/result.
+    timings=true keeps the per-stage timings in the result metadata, spatial and subject_id work as in /upload.
+    """
+    await _warmed_up()
+    worker_config, config = _request_config(spatial, subject_id)
+    temp_path, digest = await spool_upload(file)
+    key = None if subject_id else cache_key(digest, config)
+    cached = result_cache.get(key) if key else None
+    if cached is not None:
+        os.remove(temp_path)
+        job = job_store.create()
+        job_store.finish(job["job_id"], result=cached)
+        return {"job_id": job["job_id"], "status": "done"}
+    try:
+        # Taken now rather than when the task gets to run, so concurrent submissions can't all get a 202
+        worker_pool.reserve()
+    except PoolSaturated:
+        os.remove(temp_path)
+        raise HTTPException(status_code=429, detail="Server busy, retry later", headers={"Retry-After": "5"})
+    job = job_store.create()
+    task = asyncio.create_task(_run_job(job["job_id"], temp_path, key, worker_config, timings, subject_id))
+    # Keep a reference so the task isn't garbage collected while it runs
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = _get_job(job_id)
+    status, done, total = job["status"], None, None
+    if status == "queued" and job_id in worker_pool.progress:
+        # The worker registers its progress entry when it picks the job up
+        status = "running"
+        done, total = worker_pool.progress.get(job_id, (0, None))
+    elif status == "done":
+        done = total = job["result"]["metadata"]["windows"]
+    return {
+        "job_id": job_id,
+        "status": status,
+        "progress": {"windows_done": done, "windows_total": total},
+        "error": job["error"]
+    }
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, request: Request, fmt: str = Query(None, alias="format")):
+    """The job's result, in the format negotiated as in /upload."""
+    response_format = _response_format(request, fmt)
+    job = _get_job(job_id)
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return _respond(job["result"], response_format)
+
+
+async def _run_job(job_id, temp_path, key, worker_config=WORKER_CONFIG, timings=False, subject_id=None):
+    """
+    Runs a job in the worker pool, in the slot submit_job reserved for it; key is None for results that
+    must not be cached.
+    """
+    progress = worker_pool.progress
+    try:
+        result = await worker_pool.run(process_job, temp_path, worker_config, job_id, progress, subject_id,
+                                       reserved=True)
+        diagnostics = _record_diagnostics(result)
+        if key is not None:
+            result_cache.put(key, result)
+        job_store.finish(job_id, result=_with_diagnostics(result, diagnostics, timings=timings))
+    except Exception as e:
+        job_store.finish(job_id, error=f"{type(e).__name__}: {e}")
+    finally:
+        progress.pop(job_id, None)
+        os.remove(temp_path)
+
+
+@app.get("/results/{content_sha256}")
+async def cached_result(content_sha256: str, request: Request, spatial: str = "",
+                        fmt: str = Query(None, alias="format")):
+    """
+    Looks up a result by the sha256 of the file contents, so a client can skip the upload
+    entirely when the same file was analysed before with the current configuration.
+    """
+    response_format = _response_format(request, fmt)
+    await _warmed_up()
+    result = result_cache.get(cache_key(content_sha256.lower(), _request_config(spatial)[1]))
+    if result is None:
+        raise HTTPException(status_code=404, detail="No cached result for this file")
+    return _respond(result, response_format)
+
+
+@app.get("/results/{content_sha256}/view")
+async def cached_result_view(content_sha256: str, start_sec: float = None, end_sec: float = None,
+                             points: int = Query(1000, ge=3, le=100000), method: str = "lttb"):
+    """
+    Plot ready view of a cached result for the dashboard (see EEG_Timeline.result_view): run-length
+    merged timeline segments and the score series downsampled to points per series, for the time
+    range [start_sec, end_sec] (the whole session by default). Zooming in means asking again for a
+    narrower range.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise HTTPException(status_code=422, detail=f"method must be one of {DOWNSAMPLING_METHODS}")
+    await _warmed_up()
+    result = result_cache.get(cache_key(content_sha256.lower(), get_processor().config()))
+    if result is None:
+        raise HTTPException(status_code=404, detail="No cached result for this file")
+    return result_view(result, start_sec, end_sec, points, method)
+
+
+@app.get("/baselines/{subject_id}")
+async def subject_baseline(subject_id: str):
+    """Stored baseline of a subject: sessions seen and the count/mean/variance of every window metric."""
+    stored = _baseline_store().get(subject_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="No baseline stored for this subject")
+    return stored
+
+
+@app.delete("/baselines/{subject_id}")
+async def delete_subject_baseline(subject_id: str):
+    if not _baseline_store().delete(subject_id):
+        raise HTTPException(status_code=404, detail="No baseline stored for this subject")
+    return {"subject_id": subject_id, "deleted": True}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.metrics()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage timings plus pool/cache/job gauges in the Prometheus text format."""
+    cache = result_cache.metrics()
+    gauges = {
+        "eeg_workers_in_flight": ("Uploads and jobs running or queued in the worker pool.", worker_pool.in_flight),
+        "eeg_workers_capacity": ("Maximum uploads and jobs in flight before requests are refused.", worker_pool.capacity),
+        "eeg_jobs_stored": ("Jobs currently kept in the job store.", len(job_store)),
+        "eeg_cache_hit_ratio": ("Result cache hit ratio since startup.", cache["hit_ratio"]),
+        "eeg_cache_memory_entries": ("Results held in the in-memory cache tier.", cache["memory_entries"])
+    }
+    return PlainTextResponse(stage_metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+
+def _record_diagnostics(result):
+    """
+    Takes the timings/profile the worker attached out of the result metadata (so they are never cached)
+    and records the timings for /metrics.
+    """
+    diagnostics = {k: result["metadata"].pop(k) for k in ("timings", "profile") if k in result["metadata"]}
+    stage_metrics.observe(diagnostics.get("timings"))
+    return diagnostics
+
+
+def _with_diagnostics(result, diagnostics, timings=False, profile=False):
+    """Copy of result with the requested diagnostics put back into its metadata."""
+    wanted = {k: v for k, v in diagnostics.items() if (k == "timings" and timings) or (k == "profile" and profile)}
+    if not wanted:
+        return result
+    return {**result, "metadata": {**result["metadata"], **wanted}}
+
+
+def _request_config(spatial, subject_id=None):
+    """
+    Worker processor kwargs and cache key config for a request asking for the comma separated
+    spatial levels (none by default, which keeps the response small) and/or a subject baseline.
+    """
+    if subject_id:
+        worker_config, config = _request_config(spatial)
+        return {**worker_config, "baseline_store": _baseline_store().path}, config
+    if not spatial:
+        return WORKER_CONFIG, get_processor().config()
+    from EEG_Processor import EEGProcessor
+    levels = tuple(level.strip() for level in spatial.split(",") if level.strip())
+    try:
+        config = EEGProcessor(**PROCESSOR_CONFIG, spatial_levels=levels).config()
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {**WORKER_CONFIG, "spatial_levels": levels}, config
+
+
+def _response_format(request, fmt=None):
+    """Negotiated EEG_Formats format of a result response; 406 when none of the accepted ones can be produced."""
+    response_format = EEG_Formats.negotiate(request.headers.get("accept"), fmt)
+    if response_format is None or not EEG_Formats.available(response_format):
+        offered = [f for f in EEG_Formats.FORMATS if EEG_Formats.available(f)]
+        raise HTTPException(status_code=406, detail=f"Supported formats: {', '.join(offered)} "
+                                                    f"({', '.join(EEG_Formats.MEDIA_TYPES[f] for f in offered)})")
+    return response_format
+
+
+def _respond(result, response_format):
+    if response_format == "json":
+        return result
+    return Response(EEG_Formats.encode(result, response_format), media_type=EEG_Formats.MEDIA_TYPES[response_format])
+
+
+def _baseline_store():
+    if baseline_store is None:
+        raise HTTPException(status_code=400, detail="Per subject baselines are disabled, set EEG_BASELINE_DB")
+    return baseline_store
+
+
+def _get_job(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id")
+    return job
+
+
+@app.websocket("/stream")
+async def stream_eeg(websocket: WebSocket):
+    """
+    Live streaming endpoint. Protocol:
+      1. The client sends a JSON config: {"channels": [...], "units": "uV" | "V" (optional, auto-detected otherwise)}
+      2. The client sends sample frames, rows = time points and columns = channels (same layout as the CSV),
+         either as JSON {"samples": [[...], ...]} or as binary little-endian float32.
+      3. The server pushes {"type": "window", ...} with the state and scores for every completed window.
+      4. The client sends {"type": "end"} to flush the filter tail; the server replies {"type": "end"} and closes.
+    """
+    await websocket.accept()
+    try:
+        await _warmed_up()
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=1011)
+        return
+    config = await websocket.receive_json()
+    channels = config.get("channels")
+    if not channels:
+        await websocket.send_json({"type": "error", "detail": "The first message must list the channels"})
+        await websocket.close(code=1003)
+        return
+    units = config.get("units")
+    scale = {"uV": 1e-6, "V": 1.0}.get(units) if units else None
+    from EEG_Streaming import LiveSession
+    processor = get_processor()
+
+    try:
+        # Configurations the live path can't run (e.g. the zero-phase IIR filter) are refused here
+        session = LiveSession(processor, channels, scale=scale)
+        await websocket.send_json({
+            "type": "ready",
+            "sfreq": processor.sfreq,
+            "window_size_sec": processor.window_size,
+            "filter_delay_sec": session.stream.filter.delay / processor.sfreq
+        })
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                frame = np.frombuffer(message["bytes"], dtype="<f4").reshape(-1, len(channels))
+            else:
+                payload = json.loads(message.get("text") or "{}")
+                if payload.get("type") == "end":
+                    break
+                frame = np.asarray(payload.get("samples", []), dtype=np.float64).reshape(-1, len(channels))
+            for result in await run_in_threadpool(session.push, frame.T):
+                await websocket.send_json({"type": "window", **result})
+
+        for result in await run_in_threadpool(session.flush):
+            await websocket.send_json({"type": "window", **result})
+        await websocket.send_json({"type": "end", "windows": session.n_windows})
+        await websocket.close()
+    except WebSocketDisconnect:
+        return
+    except ValueError as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1003)
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,328 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import hashlib
+import pytest
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from fastapi import WebSocketDisconnect
+import main
+from EEG_Processor import EEGProcessor
+from EEG_Timeline import result_view
+from main import app
+
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+@pytest.fixture
+def eeg_csv_bytes():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((65 * 250, len(CHANNELS))) * 10, columns=CHANNELS)
+    return df.to_csv(index=False).encode()
+
+
+def test_upload_runs_in_worker_pool(eeg_csv_bytes):
+    with TestClient(app) as client:
+        response = client.post("/upload", files={"file": ("session.csv", eeg_csv_bytes, "text/csv")})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["metadata"]["windows"] == 2
+    assert len(body["timeline"]) == len(body["scores"]) == 2
+
+
+def test_upload_returns_429_when_pool_saturated(eeg_csv_bytes, monkeypatch):
+    pool = main.WorkerPool(max_workers=1, max_queue=0)
+    pool.in_flight = 1
+    monkeypatch.setattr(main, "worker_pool", pool)
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    response = TestClient(app).post("/upload", files={"file": ("session.csv", eeg_csv_bytes, "text/csv")})
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+def test_job_submission_reserves_its_worker_slot(eeg_csv_bytes, monkeypatch):
+    # The slot is taken before the 202, not when the background task gets to the pool
+    pool = main.WorkerPool(max_workers=1, max_queue=0)
+    started = []
+
+    async def waiting_job(job_id, temp_path, *args):
+        started.append(job_id)
+        os.remove(temp_path)
+
+    monkeypatch.setattr(main, "worker_pool", pool)
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    monkeypatch.setattr(main, "_run_job", waiting_job)
+    client = TestClient(app)
+    first = client.post("/jobs", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")})
+    second = client.post("/jobs", files={"file": ("b.csv", eeg_csv_bytes, "text/csv")})
+    assert first.status_code == 202 and second.status_code == 429
+    assert pool.in_flight == 1 and len(started) == 1
+    pool.release()
+    assert client.post("/jobs", files={"file": ("c.csv", eeg_csv_bytes, "text/csv")}).status_code == 202
+
+
+def test_worker_pool_runs_in_reserved_slot():
+    pool = main.WorkerPool(max_workers=1, max_queue=0)
+    pool.reserve()
+    with pytest.raises(main.PoolSaturated):
+        pool.reserve()
+    try:
+        assert asyncio.run(pool.run(os.getpid, reserved=True)) != os.getpid()
+    finally:
+        pool.shutdown()
+    assert pool.in_flight == 0
+
+
+def test_repeated_upload_is_served_from_cache(eeg_csv_bytes, monkeypatch):
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    with TestClient(app) as client:
+        first = client.post("/upload", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()
+        second = client.post("/upload", files={"file": ("b.csv", eeg_csv_bytes, "text/csv")}).json()
+        by_hash = client.get(f"/results/{hashlib.sha256(eeg_csv_bytes).hexdigest()}")
+        stats = client.get("/cache/stats").json()
+    assert second == first
+    assert by_hash.status_code == 200 and by_hash.json() == first
+    assert stats["misses"] == 1 and stats["memory_hits"] == 2
+
+
+def test_job_api_submit_poll_result(eeg_csv_bytes, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    with TestClient(app) as client:
+        response = client.post("/jobs", files={"file": ("session.csv", eeg_csv_bytes, "text/csv")})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        for _ in range(200):
+            status = client.get(f"/jobs/{job_id}").json()
+            if status["status"] in ("done", "failed"):
+                break
+            time.sleep(0.05)
+        assert status["status"] == "done"
+        assert status["progress"] == {"windows_done": 2, "windows_total": 2}
+
+        result = client.get(f"/jobs/{job_id}/result").json()
+
+    # Same schema and content as the synchronous path
+    (tmp_path / "session.csv").write_bytes(eeg_csv_bytes)
+    expected = EEGProcessor().process_csv(tmp_path / "session.csv")
+    assert result["timeline"] == expected["timeline"]
+    assert result["metadata"] == expected["metadata"]
+    assert pd.DataFrame(result["scores"]).values == pytest.approx(pd.DataFrame(expected["scores"]).values)
+
+
+def test_unknown_job_is_404():
+    assert TestClient(app).get("/jobs/does-not-exist").status_code == 404
+
+
+def test_job_store_ttl_and_size_eviction(monkeypatch):
+    store = main.JobStore(max_jobs=2, ttl_sec=10)
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+
+    first, second = store.create(), store.create()
+    store.finish(first["job_id"], result={})
+    store.finish(second["job_id"], result={})
+    third = store.create()
+    # Over capacity: the oldest finished job goes first, unfinished jobs are never evicted
+    assert len(store) == 2
+    assert store.get(first["job_id"]) is None
+    assert store.get(second["job_id"]) is not None
+
+    clock[0] += 11
+    assert store.get(second["job_id"]) is None
+    assert store.get(third["job_id"]) is not None
+
+
+def test_stream_endpoint_emits_windows():
+    """Streams ~65s of data in 1s binary frames and checks a result comes back for each 30s window."""
+    rng = np.random.default_rng(0)
+    data = (rng.standard_normal((65 * 250, len(CHANNELS))) * 10).astype('<f4')
+
+    with TestClient(app).websocket_connect("/stream") as ws:
+        ws.send_json({"channels": CHANNELS})
+        assert ws.receive_json()["type"] == "ready"
+        for start in range(0, len(data), 250):
+            ws.send_bytes(data[start:start + 250].tobytes())
+        ws.send_json({"type": "end"})
+
+        messages = []
+        while True:
+            msg = ws.receive_json()
+            messages.append(msg)
+            if msg["type"] == "end":
+                break
+
+    windows = [m for m in messages if m["type"] == "window"]
+    assert [w["window"] for w in windows] == [0, 1]
+    assert set(windows[0]["scores"]) == {"drowsiness_score", "arousal_score", "focus_score", "mind_wandering_score"}
+    # The first window is its own baseline
+    assert windows[0]["state"] == "Baseline/Neutral"
+
+
+def test_stream_endpoint_rejects_missing_channels():
+    with TestClient(app).websocket_connect("/stream") as ws:
+        ws.send_json({})
+        assert ws.receive_json()["type"] == "error"
+
+
+def test_upload_timings_profile_and_metrics(eeg_csv_bytes, monkeypatch):
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    monkeypatch.setattr(main, "stage_metrics", main.StageMetrics())
+    with TestClient(app) as client:
+        timed = client.post("/upload?timings=true", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()
+        cached = client.post("/upload", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()
+        profiled = client.post("/upload?profile=true", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()
+        metrics = client.get("/metrics")
+    assert "filter" in timed["metadata"]["timings"]["stages"]
+    # Diagnostics are never cached
+    assert "timings" not in cached["metadata"]
+    assert profiled["metadata"]["profile"]["samples"] > 0
+    assert "timings" not in profiled["metadata"]
+    assert metrics.status_code == 200
+    assert "eeg_processing_runs_total 2" in metrics.text
+    assert 'eeg_stage_wall_seconds_count{stage="psd"} 2' in metrics.text
+
+
+def test_upload_spatial_levels(eeg_csv_bytes, monkeypatch):
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    with TestClient(app) as client:
+        plain = client.post("/upload", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()
+        spatial = client.post("/upload?spatial=regions,channel_windows",
+                              files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()
+        bad = client.post("/upload?spatial=lobes", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")})
+    # Different levels are cached separately, and the default response has none
+    assert "spatial" not in plain
+    assert spatial["timeline"] == plain["timeline"]
+    assert set(spatial["spatial"]) == {"regions", "channel_windows"}
+    assert spatial["spatial"]["regions"]["occipital"]["channels"] == ["O1", "O2"]
+    assert len(spatial["spatial"]["channel_windows"]["AF3"]["Alpha"]) == plain["metadata"]["windows"]
+    assert bad.status_code == 422
+
+
+def test_upload_with_subject_baseline(eeg_csv_bytes, monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    with TestClient(app) as client:
+        disabled = client.post("/upload?subject_id=s1", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")})
+        monkeypatch.setattr(main, "baseline_store", main.BaselineStore(str(tmp_path / "baselines.db")))
+        first = client.post("/upload?subject_id=s1", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()
+        second = client.post("/upload?subject_id=s1", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()
+        stored = client.get("/baselines/s1").json()
+        deleted = client.delete("/baselines/s1")
+        missing = client.get("/baselines/s1")
+    assert disabled.status_code == 400
+    # Never served from the cache: the second upload sees the first one's windows
+    assert first["metadata"]["baseline"]["sessions"] == 0
+    assert second["metadata"]["baseline"]["sessions"] == 1
+    assert stored["sessions"] == 2 and stored["metrics"]["Alpha"]["n"] == 2 * first["metadata"]["windows"]
+    assert deleted.status_code == 200 and missing.status_code == 404
+
+
+def test_upload_content_negotiation(eeg_csv_bytes, monkeypatch):
+    import EEG_Formats
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    with TestClient(app) as client:
+        plain = client.post("/upload", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")})
+        columnar = client.post("/upload", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")},
+                               headers={"Accept": "application/vnd.eeg.columnar+json"})
+        arrow = client.post("/upload?format=arrow", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")})
+        refused = client.post("/upload", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")},
+                              headers={"Accept": "text/html"})
+    assert plain.headers["content-type"] == "application/json"
+    assert columnar.headers["content-type"] == "application/vnd.eeg.columnar+json"
+    expected = EEG_Formats.to_columnar(plain.json())
+    assert columnar.json() == expected
+    assert EEG_Formats.decode(arrow.content, "arrow") == expected
+    assert refused.status_code == 406
+
+
+def test_result_view_endpoint(eeg_csv_bytes, monkeypatch):
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    digest = hashlib.sha256(eeg_csv_bytes).hexdigest()
+    with TestClient(app) as client:
+        missing = client.get(f"/results/{digest}/view")
+        result = client.post("/upload", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()
+        view = client.get(f"/results/{digest}/view?points=3").json()
+        zoomed = client.get(f"/results/{digest}/view?start_sec=30&end_sec=60").json()
+        bad = client.get(f"/results/{digest}/view?method=mean")
+    assert missing.status_code == 404
+    assert sum(s["windows"] for s in view["segments"]) == result["metadata"]["windows"]
+    assert view["segments"][-1]["end_sec"] == result["metadata"]["windows"] * 30
+    assert view["scores"]["focus_score"]["y"] == [s["focus_score"] for s in result["scores"]]
+    assert zoomed["range"] == [30, 60] and zoomed["segments"][0]["start_sec"] == 30
+    assert bad.status_code == 422
+
+
+def test_health_ready_and_lazy_imports():
+    # The app imports without the processing stack, the warm-up loads it
+    code = "import sys, main; assert not {'EEG_Processor', 'mne', 'pandas', 'scipy'} & set(sys.modules)"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(main.__file__))
+    with TestClient(app) as client:
+        assert client.get("/health").json() == {"status": "ok"}
+        # Requests that need the processor wait for the warm-up
+        assert client.get(f"/results/{'0' * 64}").status_code == 404
+        ready = client.get("/ready")
+    assert ready.status_code == 200
+    assert 0 < ready.json()["warmup_sec"] < ready.json()["startup_sec"]
+
+
+def test_failed_warm_up(eeg_csv_bytes, monkeypatch):
+    monkeypatch.setattr(main, "PROCESSOR_CONFIG", {**main.PROCESSOR_CONFIG, "filter_method": "none"})
+    main.get_processor.cache_clear()
+    try:
+        with TestClient(app) as client:
+            upload = client.post("/upload", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")})
+            ready = client.get("/ready")
+            # The stream is accepted first, so the client gets the reason before the close
+            with client.websocket_connect("/stream") as ws:
+                error = ws.receive_json()
+                with pytest.raises(WebSocketDisconnect) as closed:
+                    ws.receive_json()
+    finally:
+        main.get_processor.cache_clear()
+    assert upload.status_code == ready.status_code == 503
+    assert error["type"] == "error" and "Unknown filter method" in error["detail"]
+    assert closed.value.code == 1011
+
+
+def test_jobs_and_stream_with_iir_filter(eeg_csv_bytes, monkeypatch):
+    config = {**main.PROCESSOR_CONFIG, "filter_method": "iir"}
+    monkeypatch.setattr(main, "PROCESSOR_CONFIG", config)
+    monkeypatch.setattr(main, "WORKER_CONFIG", {**config, "report_timings": True})
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    main.get_processor.cache_clear()
+    try:
+        with TestClient(app) as client:
+            job_id = client.post("/jobs", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}).json()["job_id"]
+            for _ in range(200):
+                status = client.get(f"/jobs/{job_id}").json()
+                if status["status"] in ("done", "failed"):
+                    break
+                time.sleep(0.05)
+            assert status["status"] == "done", status["error"]
+            result = client.get(f"/jobs/{job_id}/result").json()
+            # The live path can't run the zero-phase filter: refused with an error frame
+            with client.websocket_connect("/stream") as ws:
+                ws.send_json({"channels": CHANNELS})
+                error = ws.receive_json()
+    finally:
+        main.get_processor.cache_clear()
+    assert result["metadata"]["windows"] == 2
+    assert error["type"] == "error" and "IIR" in error["detail"]
+
+
+def test_result_view_without_cached_result(eeg_csv_bytes, monkeypatch):
+    # The dashboard draws from the columnar result it holds when the view endpoint no longer finds it
+    monkeypatch.setattr(main, "result_cache", main.ResultCache())
+    digest = hashlib.sha256(eeg_csv_bytes).hexdigest()
+    columnar = {"Accept": "application/vnd.eeg.columnar+json"}
+    with TestClient(app) as client:
+        held = client.post("/upload", files={"file": ("a.csv", eeg_csv_bytes, "text/csv")}, headers=columnar).json()
+        served = client.get(f"/results/{digest}/view?start_sec=30&points=3").json()
+        monkeypatch.setattr(main, "result_cache", main.ResultCache(max_entries=0))
+        missing = client.get(f"/results/{digest}/view?start_sec=30&points=3")
+    assert missing.status_code == 404
+    assert result_view(held, 30, None, 3) == served
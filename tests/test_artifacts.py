@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+from benchmarks.synthetic_eeg import SyntheticEEG
+from EEG_Artifacts import RunningMedianMAD, BLINK, EMG, FLATLINE
+from EEG_Filters import bandpass
+from EEG_Processor import EEGProcessor
+from EEG_Streaming import LiveSession
+
+
+def _preprocessed(eeg):
+    data = bandpass(eeg.generate() * 1e-6, 250, 0.5, 45.0, "fft")
+    return data - data.mean(axis=0)
+
+
+def _detector(eeg, **kwargs):
+    return EEGProcessor(artifact_method="adaptive")._artifact_detector(eeg.ch_names, **kwargs)
+
+
+def test_running_median_mad_tracks_the_distribution():
+    rng = np.random.default_rng(0)
+    stats = RunningMedianMAD((2,), warmup=20)
+    for x in rng.normal([0.0, 5.0], [1.0, 0.1], (3000, 2)):
+        stats.update(x)
+    # Frugal estimates wander around the true values by ~10%
+    assert stats.median == pytest.approx([0.0, 5.0], abs=0.3)
+    assert stats.mad == pytest.approx([0.674, 0.0674], rel=0.3)
+    # A lasting level change is followed
+    for x in rng.normal([3.0, 5.0], [1.0, 0.1], (3000, 2)):
+        stats.update(x)
+    assert stats.median[0] == pytest.approx(3.0, abs=0.3)
+
+
+def test_detector_is_chunking_and_scale_invariant():
+    eeg = SyntheticEEG(14, 120, blinks_per_min=10, emg_bursts=2, seed=3)
+    data = _preprocessed(eeg)
+    runs = []
+    for scale, chunk in ((1.0, 7500), (1.0, 333), (1e6, 1000)):
+        detector = _detector(eeg)
+        for start in range(0, data.shape[1], chunk):
+            detector.push(data[:, start:start + chunk] * scale)
+        detector.flush()
+        runs.append((np.array(detector.codes), list(detector.blinks)))
+    assert runs[0][0].shape == (120, 14)
+    for codes, blinks in runs[1:]:
+        assert np.array_equal(codes, runs[0][0])
+        assert blinks == runs[0][1]
+
+
+def test_detector_finds_injected_artifacts():
+    eeg = SyntheticEEG(14, 600, blinks_per_min=10, flatlines=1, flatline_channel_frac=0.5, emg_bursts=3,
+                       emg_uv=80, seed=5)
+    detector = _detector(eeg)
+    detector.push(_preprocessed(eeg))
+    detector.flush()
+    codes = np.array(detector.codes)
+
+    truth = [e["start"] + 37 for e in eeg.events if e["type"] == "blink"]
+    found = np.array(detector.blinks)
+    assert np.mean([np.abs(found - b).min() < 60 for b in truth]) > 0.8
+    assert len(found) <= len(truth)
+    assert (codes[found // 250][:, detector.frontal] == BLINK).all()
+    for event in eeg.events:
+        inside = codes[event["start"] // 250 + 1:event["stop"] // 250 - 1][:, event["channels"]]
+        if event["type"] == "emg":
+            assert (inside == EMG).mean() > 0.5
+        elif event["type"] == "flatline" and event["start"] > 30 * 250:
+            assert (inside == FLATLINE).mean() > 0.5
+
+    # Without the injected events hardly anything is flagged
+    clean = SyntheticEEG(14, 600, blinks_per_min=0, seed=6)
+    detector = _detector(clean)
+    detector.push(_preprocessed(clean))
+    detector.flush()
+    assert (np.array(detector.codes) > 0).mean() < 0.01
+
+
+def test_adaptive_artifacts_in_every_path(tmp_path):
+    eeg = SyntheticEEG(14, 185, blinks_per_min=10, emg_bursts=2, emg_uv=80, flatlines=1, seed=2)
+    eeg.write_csv(tmp_path / "s.csv")
+
+    processor = EEGProcessor(artifact_method="adaptive")
+    result = processor.process_csv(tmp_path / "s.csv")
+    info = result["metadata"]["artifacts"]
+    assert info["method"] == "adaptive" and info["blinks"] == len(info["blink_times_sec"]) > 10
+    assert {"start_sec", "end_sec", "reasons"} <= set(info["bad_segments"][0])
+    assert "Artifact" in result["timeline"]
+    for kwargs in ({"low_memory": True}, {"psd_method": "welch"}):
+        other = EEGProcessor(artifact_method="adaptive", **kwargs).process_csv(tmp_path / "s.csv")
+        assert other["timeline"] == result["timeline"] and other["metadata"]["artifacts"] == info
+    streamed = processor.process_csv_streaming(tmp_path / "s.csv", chunk_rows=1000)
+    assert streamed["timeline"] == result["timeline"] and streamed["metadata"]["artifacts"] == info
+
+    # Live: the same decisions with only the last window's segments kept
+    session = LiveSession(processor, eeg.ch_names)
+    data = eeg.generate()
+    windows = []
+    for start in range(0, data.shape[1], 250):
+        windows += session.push(data[:, start:start + 250])
+    windows += session.flush()
+    assert [w["state"] == "Artifact" for w in windows] == [s == "Artifact" for s in result["timeline"]]
+    assert len(session.detector.codes) <= 52
+    assert sum(len(w["artifacts"]["blink_times_sec"]) for w in windows) == pytest.approx(info["blinks"], abs=2)
+
+    assert EEGProcessor(artifact_method="adaptive").config() != EEGProcessor().config()
+    with pytest.raises(ValueError):
+        EEGProcessor(artifact_method="ica")
+
+
+def test_live_windows_shorter_than_the_warmup(tmp_path):
+    # 10 s windows complete before the 20 segment warm-up: live holds them until the detector is seeded
+    eeg = SyntheticEEG(14, 65, blinks_per_min=20, emg_bursts=1, emg_uv=80, seed=4)
+    eeg.write_csv(tmp_path / "s.csv")
+    processor = EEGProcessor(window_size=10, artifact_method="adaptive")
+    batch = processor.process_csv(tmp_path / "s.csv")
+
+    session = LiveSession(processor, eeg.ch_names)
+    data = eeg.generate()
+    windows = session.push(data[:, :2600])
+    assert windows == []
+    for start in range(2600, data.shape[1], 250):
+        windows += session.push(data[:, start:start + 250])
+    windows += session.flush()
+    assert [w["window"] for w in windows] == list(range(len(batch["timeline"])))
+    assert [w["state"] == "Artifact" for w in windows] == [s == "Artifact" for s in batch["timeline"]]
+    assert "Artifact" in batch["timeline"][:2]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from EEG_Baselines import BaselineStore
+from EEG_Processor import EEGProcessor, INDEX_KEYS
+
+
+def test_store_running_stats_match_all_windows(tmp_path):
+    store = BaselineStore(str(tmp_path / "baselines.db"))
+    rng = np.random.default_rng(0)
+    sessions = [rng.normal(5, 2, size=(n, 3)) for n in (4, 1, 30, 7)]
+    for values in sessions:
+        store.add_session("s1", ["a", "b", "c"], values)
+    store.add_session("s1", ["a", "b", "c"], np.empty((0, 3)))  # Nothing clean, not counted
+
+    # A new instance reads the same file
+    stored = BaselineStore(str(tmp_path / "baselines.db")).get("s1")
+    everything = np.concatenate(sessions)
+    assert stored["sessions"] == 4
+    for i, metric in enumerate("abc"):
+        assert stored["metrics"][metric]["n"] == len(everything)
+        assert stored["metrics"][metric]["mean"] == pytest.approx(everything[:, i].mean(), rel=1e-12)
+        assert stored["metrics"][metric]["var"] == pytest.approx(everything[:, i].var(ddof=1), rel=1e-12)
+    assert store.get("s2") is None
+    assert store.delete("s1") and not store.delete("s1")
+    assert store.get("s1") is None
+
+
+def _session_csv(path, seed, alpha_uv):
+    rng = np.random.default_rng(seed)
+    t = np.arange(125 * 250) / 250
+    data = rng.standard_normal((len(t), 4)) * 10
+    data[:, 2:] += alpha_uv * np.sin(2 * np.pi * 10 * t)[:, None]  # Occipital only, or the reference removes it
+    pd.DataFrame(data, columns=['F3', 'F4', 'O1', 'O2']).to_csv(path, index=False)
+    return path
+
+
+def test_processor_subject_baseline(tmp_path):
+    store = BaselineStore(str(tmp_path / "baselines.db"))
+    processor = EEGProcessor(baseline_store=store, baseline_min_windows=4)
+    calm = _session_csv(tmp_path / "calm.csv", 0, alpha_uv=0)
+    alpha = _session_csv(tmp_path / "alpha.csv", 1, alpha_uv=15)
+
+    first = processor.process_csv(calm, subject_id="s1")
+    # Nothing stored yet: scored against itself, like without a subject
+    assert first["metadata"]["baseline"] == {"subject_id": "s1", "source": "session", "sessions": 0,
+                                             "windows": 0, "updated": True}
+    assert first["scores"] == EEGProcessor().process_csv(calm)["scores"]
+    assert store.get("s1")["metrics"]["Alpha"]["n"] == 4
+
+    second = processor.process_csv(alpha, subject_id="s1")
+    assert second["metadata"]["baseline"]["source"] == "subject"
+    assert second["metadata"]["baseline"]["windows"] == 4
+    # Against the calm session's baseline the alpha session has a much lower theta/alpha than against itself
+    own = EEGProcessor().process_csv(alpha)
+    assert all(s["drowsiness_score"] < o["drowsiness_score"] / 2 for s, o in zip(second["scores"], own["scores"]))
+    assert store.get("s1")["sessions"] == 2
+
+    # The baseline is the indices of the stored mean band powers
+    stored = store.get("s1")["metrics"]
+    bands = np.array([stored[b]["mean"] for b in processor.bands])
+    assert set(INDEX_KEYS) <= set(stored)
+    assert processor._band_indices(bands)[0] == pytest.approx(stored["Theta"]["mean"] / stored["Alpha"]["mean"])
+
+    readonly = EEGProcessor(baseline_store=str(tmp_path / "baselines.db"), update_baseline=False)
+    assert readonly.process_csv(calm, subject_id="s1")["metadata"]["baseline"]["updated"] is False
+    assert store.get("s1")["sessions"] == 2
+    with pytest.raises(ValueError):
+        EEGProcessor().process_csv(calm, subject_id="s1")
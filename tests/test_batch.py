@@ -0,0 +1,27 @@
+import json
+import numpy as np
+import pandas as pd
+import EEG_Batch
+
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+def test_batch_cli_processes_directory_and_resumes(tmp_path, capsys):
+    rng = np.random.default_rng(0)
+    for subject in ("s01", "s02"):
+        (tmp_path / "data" / subject).mkdir(parents=True)
+        df = pd.DataFrame(rng.standard_normal((65 * 250, len(CHANNELS))) * 10, columns=CHANNELS)
+        df.to_csv(tmp_path / "data" / subject / "session.csv", index=False)
+    out = tmp_path / "out"
+
+    assert EEG_Batch.main([str(tmp_path / "data"), "--out", str(out), "--workers", "1"]) == 0
+    result = json.loads((out / "s01__session.json").read_text())
+    assert result["metadata"]["windows"] == 2
+    summary = pd.read_csv(out / "cohort_summary.csv")
+    assert len(summary) == 2 and (summary["windows"] == 2).all()
+
+    # Second run: everything is already done
+    capsys.readouterr()
+    assert EEG_Batch.main([str(tmp_path / "data"), "--out", str(out), "--workers", "1"]) == 0
+    assert "2 already done, 0 to process" in capsys.readouterr().out
@@ -0,0 +1,70 @@
+import json
+import numpy as np
+from benchmarks.synthetic_eeg import SyntheticEEG, channel_names
+from benchmarks import run_suite
+from EEG_Processor import EEGProcessor
+
+
+def test_channel_names_cover_the_scalp():
+    assert channel_names(14)[0] == 'AF3'
+    names = channel_names(64)
+    assert len(set(names)) == 64
+    assert any(n.startswith('O') for n in names) and any(n.startswith('Fp') for n in names)
+    assert len(set(channel_names(256))) == 256
+
+
+def test_generator_is_reproducible_and_block_consistent(tmp_path):
+    eeg = SyntheticEEG(8, 45, seed=3, flatlines=1, emg_bursts=1)
+    data = eeg.generate()
+    assert data.shape == (8, 45 * 250)
+    assert np.array_equal(data, SyntheticEEG(8, 45, seed=3, flatlines=1, emg_bursts=1).generate())
+    assert not np.array_equal(data, SyntheticEEG(8, 45, seed=4, flatlines=1, emg_bursts=1).generate())
+
+    df = eeg.to_frame()
+    from_csv = eeg.write_csv(tmp_path / "s.csv")
+    import pandas as pd
+    assert np.allclose(pd.read_csv(from_csv)[eeg.ch_names].values, df[eeg.ch_names].values, atol=1e-4)
+
+    flat = next(e for e in eeg.events if e["type"] == "flatline")
+    assert np.all(data[flat["channels"], flat["start"]:flat["stop"]] == 0)
+
+
+def test_injected_artifacts_are_detected():
+    # Strong bursts on most channels, one per window: every window must be rejected
+    eeg = SyntheticEEG(14, 95, blinks_per_min=0, emg_bursts=0, seed=1)
+    eeg.events = [{"type": "emg", "start": w * 7500 + 1000, "stop": w * 7500 + 6000, "channels": list(range(10))}
+                  for w in range(3)]
+    eeg.emg_uv = 300
+    processor = EEGProcessor()
+    raw = processor._build_raw(eeg.generate(), eeg.ch_names)
+    windows = raw.get_data()[:, :3 * 7500].reshape(14, 3, 7500).transpose(1, 0, 2)
+    report = processor.screen_artifacts(windows, eeg.ch_names)
+    assert report["noisy_epochs"].all()
+    assert eeg.window_truth() == [{"emg"}, {"emg"}, {"emg"}]
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = {"results": [{"case": "a", "median_wall_sec": 1.0}, {"case": "b", "median_wall_sec": 0.01},
+                            {"case": "c", "skipped": "too big"}]}
+    results = {"results": [{"case": "a", "median_wall_sec": 1.3}, {"case": "b", "median_wall_sec": 0.03},
+                           {"case": "c", "median_wall_sec": 5.0}]}
+    # b tripled but stays under the min_delta noise floor, c has no baseline timing
+    assert run_suite.compare(results, baseline, threshold=0.2) == [("a", 1.0, 1.3, 1.3)]
+    assert run_suite.compare(results, baseline, threshold=0.5) == []
+
+
+def test_suite_writes_results_and_fails_on_regression(tmp_path):
+    out = tmp_path / "results.json"
+    argv = ["--targets", "process_csv", "noisy_epochs", "--durations", "65", "--channels", "14",
+            "--repeats", "1", "--data-dir", str(tmp_path), "--out", str(out)]
+    assert run_suite.main(argv) == 0
+    results = json.loads(out.read_text())
+    assert [r["case"] for r in results["results"]] == ["process_csv/14ch/65s", "noisy_epochs/14ch/65s"]
+    assert results["results"][0]["stages"]["filter"] > 0
+
+    # A baseline that was impossibly fast makes the run fail
+    for r in results["results"]:
+        r["median_wall_sec"] = 1e-6
+    (tmp_path / "baseline.json").write_text(json.dumps(results))
+    code = run_suite.main(argv + ["--baseline", str(tmp_path / "baseline.json"), "--min-delta", "0"])
+    assert code == 1
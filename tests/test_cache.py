@@ -0,0 +1,41 @@
+import os
+import EEG_Cache
+from EEG_Cache import ResultCache, cache_key
+
+
+def test_cache_key_depends_on_config():
+    assert cache_key("abc", {"sfreq": 250}) == cache_key("abc", {"sfreq": 250})
+    assert cache_key("abc", {"sfreq": 250}) != cache_key("abc", {"sfreq": 128})
+    assert cache_key("abc", {"sfreq": 250}) != cache_key("abd", {"sfreq": 250})
+
+
+def test_cache_key_depends_on_result_version(monkeypatch):
+    key = cache_key("abc", {"sfreq": 250})
+    monkeypatch.setattr(EEG_Cache, "RESULT_VERSION", EEG_Cache.RESULT_VERSION + 1)
+    assert cache_key("abc", {"sfreq": 250}) != key
+
+
+def test_memory_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    cache.get("a")            # a is now the most recently used
+    cache.put("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_disk_tier_survives_memory_eviction_and_is_size_bounded(tmp_path):
+    result = {"timeline": ["High Focus"] * 100}   # ~1.4KB of JSON
+    cache = ResultCache(max_entries=1, disk_dir=str(tmp_path), max_disk_bytes=3000)
+    cache.put("a", result)
+    cache.put("b", result)
+    assert cache.get("a") == result
+    assert cache.metrics()["disk_hits"] == 1
+
+    # Only two files fit, the least recently used one is dropped
+    os.utime(tmp_path / "a.json", (1, 1))
+    os.utime(tmp_path / "b.json", (2, 2))
+    cache.put("c", result)
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "c.json"]
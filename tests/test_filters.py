@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+import mne
+from EEG_Filters import bandpass, channel_info, fir_kernel, iir_sos
+from EEG_Processor import EEGProcessor
+
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+def _mne_filtered(data):
+    raw = mne.io.RawArray(data.copy(), mne.create_info(data.shape[0], 250, 'eeg'), verbose=False)
+    raw.filter(l_freq=0.5, h_freq=45.0, fir_design='firwin', verbose=False)
+    return raw.get_data()
+
+
+@pytest.mark.parametrize("n_times", [1200, 20000])
+def test_fft_filter_matches_mne(n_times):
+    # 1200 samples is shorter than the kernel, which exercises the zero part of the edge padding
+    data = np.random.default_rng(0).standard_normal((3, n_times)) * 1e-5
+    expected = _mne_filtered(data)
+    assert np.allclose(bandpass(data.copy(), 250, 0.5, 45.0, "fft"), expected, rtol=0, atol=1e-18)
+    # Threads across channels give the same result
+    assert np.allclose(bandpass(data.copy(), 250, 0.5, 45.0, "fft", n_jobs=2), expected, rtol=0, atol=1e-18)
+
+
+def test_designs_and_channel_info_are_cached():
+    assert fir_kernel(250, 0.5, 45.0) is fir_kernel(250, 0.5, 45.0)
+    assert not fir_kernel(250, 0.5, 45.0).flags.writeable
+    assert iir_sos(250, 0.5, 45.0) is iir_sos(250, 0.5, 45.0)
+    info = channel_info(tuple(CHANNELS), 250)
+    assert info is channel_info(tuple(CHANNELS), 250)
+    assert info.get_montage() is not None
+
+
+def test_iir_keeps_band_powers_close(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((95 * 250, len(CHANNELS))) * 10, columns=CHANNELS)
+    df.to_csv(tmp_path / "s.csv", index=False)
+
+    processors = {m: EEGProcessor(filter_method=m) for m in ("fir", "fft", "iir")}
+    raws = {m: p._prepare_raw_data(df) for m, p in processors.items()}
+    assert np.allclose(raws["fft"].get_data(), raws["fir"].get_data(), rtol=0, atol=1e-18)
+
+    middle = slice(2000, -2000)  # away from the edge transients
+    psd = {m: processors["fir"]._compute_psd(raw.get_data()[:, middle]) for m, raw in raws.items()}
+    bands = {m: processors["fir"]._band_power_engine(p.mean(axis=0), f)["bands"] for m, (p, f) in psd.items()}
+    assert bands["iir"] == pytest.approx(bands["fir"], rel=0.01)
+
+    assert processors["iir"].config()["filter_method"] == "iir"
+    with pytest.raises(ValueError):
+        EEGProcessor(filter_method="fourier")
+    with pytest.raises(ValueError):
+        processors["iir"].process_streaming(tmp_path / "s.csv")
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+import EEG_Formats
+from EEG_Formats import decode, encode, negotiate, to_columnar
+
+RESULT = {
+    "session_profile": {"Drowsy": 50.0, "Artifact": 50.0},
+    "timeline": ["Drowsy", "Artifact", "Drowsy", "Artifact"],
+    "metadata": {"windows": 4, "window_size_sec": 30, "hop_sec": 30, "quality_warning": False},
+    "scores": [{"drowsiness_score": 1.5 + i, "arousal_score": 0.5, "focus_score": 0.25, "mind_wandering_score": 2.0}
+               for i in range(4)]
+}
+
+
+def test_negotiate():
+    assert negotiate(None) == "json"
+    assert negotiate("*/*") == "json"
+    assert negotiate("application/vnd.apache.arrow.stream") == "arrow"
+    assert negotiate("application/json;q=0.5, application/vnd.eeg.columnar+json") == "columnar"
+    assert negotiate("application/x-msgpack, application/json") == "msgpack"
+    assert negotiate("text/html") is None
+    assert negotiate("text/html", fmt="arrow") == "arrow"
+    assert negotiate(None, fmt="xml") is None
+
+
+def test_columnar_layout():
+    columnar = to_columnar(RESULT)
+    assert columnar["states"] == [0, 5, 0, 5]
+    assert [columnar["state_legend"][c] for c in columnar["states"]] == RESULT["timeline"]
+    assert columnar["scores"]["drowsiness_score"] == [1.5, 2.5, 3.5, 4.5]
+    assert columnar["metadata"] == RESULT["metadata"]
+    assert len(encode(RESULT, "columnar")) < len(encode(RESULT, "json"))
+
+
+@pytest.mark.parametrize("fmt", ["json", "columnar", "arrow", "msgpack"])
+def test_round_trip(fmt):
+    if not EEG_Formats.available(fmt):
+        pytest.skip(f"{fmt} support is not installed")
+    payload = encode(RESULT, fmt)
+    assert isinstance(payload, bytes)
+    assert decode(payload, fmt) == json.loads(json.dumps(to_columnar(RESULT)))
@@ -0,0 +1,76 @@
+import time
+import numpy as np
+import pandas as pd
+from EEG_Metrics import StageTimer, StageMetrics, SamplingProfiler
+from EEG_Processor import EEGProcessor
+
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_stage_timer_accumulates_repeated_stages():
+    timer = StageTimer(memory="tracemalloc")
+    for _ in range(3):
+        with timer.stage("work"):
+            block = np.ones(1_000_000)
+            _busy(0.01)
+        del block
+    with timer.stage("other"):
+        pass
+    report = timer.as_dict()
+    work = report["stages"]["work"]
+    assert list(report["stages"]) == ["work", "other"]
+    assert work["calls"] == 3
+    assert work["wall_sec"] >= 0.03 and work["cpu_sec"] > 0
+    assert work["peak_bytes"] >= 8_000_000
+    assert report["total_wall_sec"] >= work["wall_sec"]
+
+
+def test_processor_reports_stage_timings(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((65 * 250, len(CHANNELS))) * 10, columns=CHANNELS)
+    df.to_csv(tmp_path / "session.csv", index=False)
+
+    plain = EEGProcessor().process_csv(tmp_path / "session.csv")
+    assert "timings" not in plain["metadata"]
+
+    result = EEGProcessor(report_timings=True).process_csv(tmp_path / "session.csv")
+    stages = result["metadata"]["timings"]["stages"]
+    assert list(stages) == ["read", "scale", "montage", "filter", "reference", "epochs", "psd", "artifacts",
+                            "band_power", "classify", "aggregate"]
+    assert all(s["calls"] == 1 and s["wall_sec"] >= 0 for s in stages.values())
+    # The timings don't change the analysis
+    assert result["timeline"] == plain["timeline"]
+
+    streamed = EEGProcessor(report_timings=True).process_streaming(tmp_path / "session.csv", chunk_rows=5000)
+    assert streamed["metadata"]["timings"]["stages"]["read"]["calls"] > 1
+
+
+def test_stage_metrics_prometheus_format():
+    metrics = StageMetrics(buckets=(0.1, 1))
+    for wall in (0.05, 0.5):
+        metrics.observe({"stages": {"filter": {"wall_sec": wall, "cpu_sec": wall, "peak_bytes": 1000, "calls": 1}}})
+    text = metrics.render({"eeg_workers_in_flight": ("In flight.", 2)})
+    assert "eeg_processing_runs_total 2" in text
+    assert 'eeg_stage_wall_seconds_bucket{stage="filter",le="0.1"} 1' in text
+    assert 'eeg_stage_wall_seconds_bucket{stage="filter",le="1"} 2' in text
+    assert 'eeg_stage_wall_seconds_bucket{stage="filter",le="+Inf"} 2' in text
+    assert 'eeg_stage_wall_seconds_count{stage="filter"} 2' in text
+    assert 'eeg_stage_peak_memory_bytes{stage="filter"} 1000' in text
+    assert "# TYPE eeg_workers_in_flight gauge\neeg_workers_in_flight 2" in text
+
+
+def test_sampling_profiler_finds_hot_function():
+    with SamplingProfiler(interval=0.001) as profiler:
+        _busy(0.2)
+    report = profiler.report()
+    assert report["samples"] > 20
+    assert report["top"][0]["function"].startswith("_busy")
+    assert report["top"][0]["self_pct"] > 50
+    assert "_busy" in report["collapsed"].splitlines()[0]
@@ -2,6 +2,8 @@ import pytest
 import numpy as np
 from EEG_Processor import EEGProcessor
 import pandas as pd
+from benchmarks.synthetic_eeg import SyntheticEEG
+from EEG_Filters import bandpass
 
 
 
@@ -137,4 +139,191 @@ def test_quality_warning_trigger(processor):
         clean_psd = psd_data
     
     assert processor.quality_warning is True
-    assert clean_psd.shape == psd_data.shape
\ No newline at end of file
+    assert clean_psd.shape == psd_data.shape
+
+def test_screen_artifacts_reasons(processor):
+    """Checks the batched screening flags each artifact type and rejects epochs over the channel threshold."""
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((3, 4, 500)) * 10e-6
+    data[0, 0, :10] += 500e-6   # Blink on one channel -> kept
+    data[1, :, :] *= 1e-4       # Flatline on all channels -> rejected
+    data[2, :2, :] = np.where(np.arange(500) % 2, 110e-6, -110e-6)  # EMG on half the channels -> rejected
+
+    report = processor.screen_artifacts(data, ["AF3", "F7", "F3", "FC5"])
+
+    assert report["bad_channels"].shape == (3, 4)
+    assert report["noisy_epochs"].tolist() == [False, True, True]
+    records = {r["epoch"]: r for r in report["rejections"]}
+    assert records[0]["bad_channels"] == {"AF3": "high_amplitude"}
+    assert records[1]["bad_channels"]["FC5"] == "flatline"
+    assert records[2]["bad_channels"] == {"AF3": "emg", "F7": "emg"}
+
+
+def test_channel_stats_match_numpy(processor):
+    data = np.random.default_rng(1).standard_normal((5, 3, 200))
+    ptp, ch_std = processor._channel_stats(data, block_bytes=1)
+    assert np.allclose(ptp, np.ptp(data, axis=-1))
+    assert np.allclose(ch_std, np.std(data, axis=-1))
+
+
+def test_classify_epochs_vectorized(processor):
+    """All epochs classified at once: winner, neutral zone and artifact override."""
+    indices = np.array([
+        [1.0, 2.0, 1.0, 1.0],   # High Arousal
+        [1.0, 1.0, 1.05, 1.0],  # Neutral
+        [1.0, 1.0, 10.0, 1.0],  # High Focus but noisy
+        [3.0, 1.0, 1.0, 1.0],   # Drowsy but Total_Power above the artifact limit
+    ])
+    baseline = np.ones(4)
+    total_power = np.array([1e-10, 1e-10, 1e-10, 1e-8])
+    noisy = np.array([False, False, True, False])
+
+    state_codes, scores = processor._classify_epochs(indices, baseline, total_power, noisy)
+    result = processor._aggregate_results(state_codes, scores)
+
+    assert result["timeline"] == ["High Arousal", "Baseline/Neutral", "Artifact", "Artifact"]
+    assert list(result["session_profile"].items()) == [("Artifact", 50.0), ("High Arousal", 25.0), ("Baseline/Neutral", 25.0)]
+    assert result["scores"][0] == {"drowsiness_score": 1.0, "arousal_score": 2.0, "focus_score": 1.0, "mind_wandering_score": 1.0}
+
+
+def test_band_power_engine_matches_single_spectrum(processor):
+    """The tensor engine gives the same metrics as _calculate_band_metrics on every epoch/channel."""
+    rng = np.random.default_rng(0)
+    freqs = np.linspace(0.5, 45, 90)
+    psd = rng.uniform(0.5, 2.0, (4, 3, len(freqs)))
+
+    engine = processor._band_power_engine(psd, freqs)
+    assert engine["indices"].shape == (4, 3, 4)
+
+    single = processor._calculate_band_metrics(psd[2, 1], freqs)
+    assert engine["indices"][2, 1, 2] == pytest.approx(single["focus_index"])
+    assert engine["bands"][2, 1, 0] == pytest.approx(single["Delta"])
+    assert engine["total_power"][2, 1] == pytest.approx(single["Total_Power"])
+
+
+@pytest.mark.parametrize("hop", [2, 5, 10])
+def test_sliding_psd_matches_welch(hop):
+    """Each overlapping window's PSD equals Welch on that window with the engine's segment spacing."""
+    import mne
+    processor = EEGProcessor(hop=hop)
+    data = np.random.default_rng(0).standard_normal((3, 250 * 70)) * 1e-5
+    hop_samples = hop * 250
+    n_windows = processor.expected_windows(data.shape[1])
+    assert n_windows == (data.shape[1] - 7501) // hop_samples + 1
+
+    spectra, freqs = processor._sliding_psd(data, 7501, hop_samples, n_windows)
+    assert spectra.shape == (n_windows, len(freqs))
+    seg_step = {2: 2000, 5: 1875, 10: 2048}[hop]
+    for w in (0, n_windows // 2, n_windows - 1):
+        window = data[:, w * hop_samples:w * hop_samples + 7501]
+        expected, expected_freqs = mne.time_frequency.psd_array_welch(
+            window, 250, fmin=.5, fmax=45, n_fft=2048, n_overlap=max(0, 2048 - seg_step), verbose=False)
+        assert np.array_equal(freqs, expected_freqs)
+        assert spectra[w] == pytest.approx(expected.mean(axis=0), rel=1e-10)
+
+
+@pytest.mark.parametrize("hop, tolerance", [(2, 0.02), (5, 0.06), (10, 1e-9)])
+def test_sliding_psd_close_to_the_base_layout(hop, tolerance):
+    """The shared segments are spaced close to, not exactly, n_fft: same estimate, other samples (none at 10s)."""
+    eeg = SyntheticEEG(14, 300, blinks_per_min=0, seed=1)
+    data = bandpass(eeg.generate() * 1e-6, 250, 0.5, 45.0, "fft")
+    data -= data.mean(axis=0)
+    processor = EEGProcessor(hop=hop)
+    hop_samples = hop * 250
+    n_windows = processor.expected_windows(data.shape[1])
+
+    spectra, freqs = processor._sliding_psd(data, 7501, hop_samples, n_windows)
+    base = np.stack([processor._compute_psd(data[:, w * hop_samples:w * hop_samples + 7501])[0].mean(axis=0)
+                     for w in range(n_windows)])
+    sliding, expected = processor._band_power_engine(spectra, freqs), processor._band_power_engine(base, freqs)
+    for key in ("bands", "indices", "total_power"):
+        assert sliding[key] == pytest.approx(expected[key], rel=tolerance)
+
+
+def test_overlapping_windows_process_csv(tmp_path):
+    import mne
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((95 * 250, 4)) * 10, columns=['F3', 'F4', 'O1', 'O2'])
+    df.to_csv(tmp_path / "s.csv", index=False)
+
+    result = EEGProcessor(hop=5).process_csv(tmp_path / "s.csv")
+    assert result["metadata"]["windows"] == 13  # starts 0, 5, ..., 60s
+    assert result["metadata"]["hop_sec"] == 5
+    assert len(result["timeline"]) == len(result["scores"]) == 13
+    assert EEGProcessor().process_csv(tmp_path / "s.csv")["metadata"]["hop_sec"] == 30
+
+    # Windows shorter than n_fft: one segment of the whole window, as epochs.compute_psd does
+    short = EEGProcessor(window_size=5, hop=1)
+    result = short.process_csv(tmp_path / "s.csv")
+    assert result["metadata"]["windows"] == 90
+    assert np.isfinite(pd.DataFrame(result["scores"]).values).all()
+    data = rng.standard_normal((2, 250 * 20))
+    spectra, freqs = short._sliding_psd(data, 1251, 250, 15)
+    expected, expected_freqs = mne.time_frequency.psd_array_welch(data[:, 750:750 + 1251], 250, fmin=.5, fmax=45,
+                                                                   n_fft=1251, verbose=False)
+    assert freqs == pytest.approx(expected_freqs)
+    assert spectra[3] == pytest.approx(expected.mean(axis=0), rel=1e-10)
+
+    with pytest.raises(ValueError):
+        EEGProcessor(hop=0)
+    with pytest.raises(ValueError):
+        EEGProcessor(hop=0.001)
+    with pytest.raises(ValueError):
+        EEGProcessor(hop=5).process_streaming(tmp_path / "s.csv")
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"hop": 5}, {"filter_method": "iir"}, {"window_size": 5}])
+def test_low_memory_matches_process_csv(tmp_path, kwargs):
+    rng = np.random.default_rng(1)
+    data = rng.standard_normal((125 * 250, 4)) * 10
+    data[40 * 250:41 * 250, :2] += 1000.0  # High amplitude (on every channel after referencing), so a window is rejected
+    pd.DataFrame(data, columns=['F3', 'F4', 'O1', 'O2']).to_csv(tmp_path / "s.csv", index=False)
+
+    expected = EEGProcessor(**kwargs).process_csv(tmp_path / "s.csv")
+    for dtype, rel in (("float64", 1e-9), ("float32", 1e-4)):
+        processor = EEGProcessor(low_memory=True, buffer_dtype=dtype, report_timings=True, **kwargs)
+        result = processor.process_csv(tmp_path / "s.csv")
+        assert result["timeline"] == expected["timeline"]
+        assert "Artifact" in result["timeline"]
+        for got, want in zip(result["scores"], expected["scores"]):
+            assert got == pytest.approx(want, rel=rel)
+        assert result["metadata"]["timings"]["stages"]["filter"]["calls"] == 1
+    assert EEGProcessor(low_memory=True, buffer_dtype="float32").config() != EEGProcessor().config()
+    with pytest.raises(ValueError):
+        EEGProcessor(low_memory=True, buffer_dtype="int16")
+
+
+def test_channel_regions():
+    from EEG_Processor import channel_regions
+    assert channel_regions(['AF3', 'FC5', 'T7', 'P7', 'O1', 'Cz', 'CPz', 'FT9', 'Fpz', 'EEG001', 'A1']) == [
+        'frontal', 'central', 'temporal', 'parietal', 'occipital', 'central', 'central', 'temporal', 'frontal',
+        None, None]
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"hop": 10}, {"low_memory": True}])
+def test_spatial_features(tmp_path, kwargs):
+    rng = np.random.default_rng(2)
+    ch_names = ['F3', 'F4', 'C3', 'O1', 'O2', 'EEG001']
+    data = rng.standard_normal((95 * 250, len(ch_names))) * 10
+    data[:, 3:5] += 20 * np.sin(2 * np.pi * 10 * np.arange(len(data)) / 250)[:, None]  # Occipital alpha
+    pd.DataFrame(data, columns=ch_names).to_csv(tmp_path / "s.csv", index=False)
+
+    levels = ("regions", "channels", "region_windows", "channel_windows")
+    result = EEGProcessor(spatial_levels=levels, **kwargs).process_csv(tmp_path / "s.csv")
+    spatial = result["spatial"]
+    assert result["timeline"] == EEGProcessor(**kwargs).process_csv(tmp_path / "s.csv")["timeline"]
+    assert list(spatial["regions"]) == ["frontal", "central", "occipital"]
+    assert spatial["regions"]["frontal"]["channels"] == ['F3', 'F4']
+    assert list(spatial["channels"]) == ch_names
+    # The average reference moves a third of the alpha to the other channels (with the opposite sign)
+    assert spatial["regions"]["occipital"]["Alpha"] > 3 * spatial["regions"]["frontal"]["Alpha"]
+    # Band powers are linear in the PSD, so a region's are the mean of its channels'
+    for band in ("Delta", "Alpha", "Gamma"):
+        assert spatial["regions"]["frontal"][band] == pytest.approx(
+            np.mean([spatial["channels"][ch][band] for ch in ('F3', 'F4')]), rel=1e-10)
+        assert spatial["region_windows"]["central"][band] == pytest.approx(spatial["channel_windows"]["C3"][band])
+    region = spatial["regions"]["central"]
+    assert region["focus_index"] == pytest.approx(region["Beta"] / region["Alpha"])
+    assert len(spatial["channel_windows"]["O1"]["focus_index"]) == result["metadata"]["windows"]
+    with pytest.raises(ValueError):
+        EEGProcessor(spatial_levels=("lobes",))
@@ -0,0 +1,83 @@
+import pytest
+import numpy as np
+import pandas as pd
+import mne
+from EEG_Processor import EEGProcessor
+from EEG_Readers import read_recording, iter_recording
+
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+@pytest.fixture
+def eeg_df():
+    rng = np.random.default_rng(3)
+    n = 65 * 250
+    df = pd.DataFrame(rng.standard_normal((n, len(CHANNELS))) * 10, columns=CHANNELS)
+    df.insert(0, 'time', np.arange(n) / 250)
+    df['label'] = 1
+    return df
+
+
+def write(df, path):
+    """Writes the DataFrame in the format given by the path's extension."""
+    ext = path.suffix
+    if ext == '.csv':
+        df.to_csv(path, index=False)
+    elif ext == '.parquet':
+        df.to_parquet(path)
+    elif ext == '.feather':
+        df.to_feather(path)
+    elif ext == '.npy':
+        np.save(path, df.to_records(index=False))
+    return path
+
+
+@pytest.mark.parametrize("ext", ['.csv', '.parquet', '.feather', '.npy'])
+def test_readers_apply_same_channel_exclusion(eeg_df, tmp_path, ext):
+    if ext in ('.parquet', '.feather'):
+        pytest.importorskip("pyarrow")
+    path = write(eeg_df, tmp_path / f"session{ext}")
+
+    ch_names, data, sfreq = read_recording(path)
+    assert list(ch_names) == CHANNELS
+    assert sfreq is None
+    assert np.allclose(data, eeg_df[CHANNELS].values.T)
+
+    chunks = [block for _, block in iter_recording(path, chunk_rows=4000)]
+    assert np.allclose(np.concatenate(chunks, axis=1), data)
+
+
+def test_plain_npy_gets_generic_channel_names(eeg_df, tmp_path):
+    path = tmp_path / "session.npy"
+    np.save(path, eeg_df[CHANNELS].values.astype(np.float32))
+    ch_names, data, _ = read_recording(path)
+    assert ch_names[0] == "EEG000" and len(ch_names) == len(CHANNELS)
+    assert data.shape == (len(CHANNELS), len(eeg_df))
+
+
+@pytest.mark.parametrize("ext", ['.parquet', '.npy'])
+def test_process_file_matches_process_csv(eeg_df, tmp_path, ext):
+    if ext == '.parquet':
+        pytest.importorskip("pyarrow")
+    processor = EEGProcessor()
+    expected = processor.process_csv(write(eeg_df, tmp_path / "session.csv"))
+    result = processor.process_file(write(eeg_df, tmp_path / f"session{ext}"))
+    assert result["timeline"] == expected["timeline"]
+    assert result["metadata"] == expected["metadata"]
+    assert pd.DataFrame(result["scores"]).values == pytest.approx(pd.DataFrame(expected["scores"]).values)
+
+
+def test_edf_reader_reports_sfreq_and_volts(eeg_df, tmp_path):
+    pytest.importorskip("edfio")
+    info = mne.create_info(CHANNELS, 250, 'eeg')
+    raw = mne.io.RawArray(eeg_df[CHANNELS].values.T * 1e-6, info, verbose=False)
+    path = tmp_path / "session.edf"
+    mne.export.export_raw(path, raw, fmt='edf', verbose=False)
+
+    ch_names, data, sfreq = read_recording(path)
+    assert ch_names == CHANNELS and sfreq == 250
+    assert np.allclose(data[:, :len(eeg_df)], raw.get_data(), atol=1e-7)
+
+    with pytest.raises(ValueError, match="sampled at 250Hz"):
+        EEGProcessor(sfreq=128).process_file(path)
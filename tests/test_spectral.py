@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+import mne
+from EEG_Processor import EEGProcessor
+from EEG_Spectral import compute_psd, dpss_tapers
+
+
+def test_welch_matches_mne():
+    data = np.random.default_rng(0).standard_normal((6, 14, 7501)) * 1e-5
+    expected, expected_freqs = mne.time_frequency.psd_array_welch(data, 250, fmin=.5, fmax=45, n_fft=2048,
+                                                                  verbose=False)
+    for n_jobs, block_bytes in ((1, 1 << 25), (3, 1 << 25), (2, 1 << 18)):
+        psd, freqs = compute_psd(data, 250, method="welch", n_jobs=n_jobs, block_bytes=block_bytes)
+        assert np.array_equal(freqs, expected_freqs)
+        assert np.allclose(psd, expected, rtol=1e-12, atol=0)
+    # One window of many channels is split over the threads by channel, strided views are read as they are
+    view = np.lib.stride_tricks.sliding_window_view(data[0], 7501, axis=1)[:, ::500].transpose(1, 0, 2)
+    assert np.allclose(compute_psd(view, 250, method="welch", n_jobs=4)[0], expected[0], rtol=1e-12, atol=0)
+    # Windows shorter than n_fft are one segment of their own length, like epochs.compute_psd
+    short = data[:2, :, :1251]
+    expected, expected_freqs = mne.time_frequency.psd_array_welch(short, 250, fmin=.5, fmax=45, n_fft=1251,
+                                                                  verbose=False)
+    for method in ("mne", "welch"):
+        psd, freqs = compute_psd(short, 250, method=method)
+        assert freqs == pytest.approx(expected_freqs)
+        assert np.allclose(psd, expected, rtol=1e-12, atol=0)
+    with pytest.raises(ValueError):
+        compute_psd(data, 250, method="periodogram")
+
+
+def test_multitaper_matches_mne():
+    data = np.random.default_rng(1).standard_normal((3, 4, 7501)) * 1e-5
+    expected, expected_freqs = mne.time_frequency.psd_array_multitaper(
+        data, 250, fmin=.5, fmax=45, adaptive=False, low_bias=True, normalization='full', verbose=False)
+    psd, freqs = compute_psd(data, 250, method="multitaper", n_jobs=2)
+    assert np.array_equal(freqs, expected_freqs)
+    assert np.allclose(psd, expected, rtol=1e-12, atol=0)
+    assert dpss_tapers(7501) is dpss_tapers(7501)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"hop": 10}, {"spatial_levels": ("regions",)}, {"window_size": 5}])
+def test_psd_methods_match_mne_output(tmp_path, kwargs):
+    rng = np.random.default_rng(2)
+    data = rng.standard_normal((125 * 250, 4)) * 10
+    data[40 * 250:41 * 250, :2] += 1000.0
+    pd.DataFrame(data, columns=['F3', 'F4', 'O1', 'O2']).to_csv(tmp_path / "s.csv", index=False)
+
+    expected = EEGProcessor(**kwargs).process_csv(tmp_path / "s.csv")
+    result = EEGProcessor(psd_method="welch", **kwargs).process_csv(tmp_path / "s.csv")
+    assert result["timeline"] == expected["timeline"]
+    for got, want in zip(result["scores"], expected["scores"]):
+        assert got == pytest.approx(want, rel=1e-9)
+    for region, metrics in expected.get("spatial", {}).get("regions", {}).items():
+        assert result["spatial"]["regions"][region]["Alpha"] == pytest.approx(metrics["Alpha"], rel=1e-9)
+
+    # The multitaper estimate is a different (smoother) one, on the same windows and with the same scale
+    multitaper = EEGProcessor(psd_method="multitaper", **kwargs).process_csv(tmp_path / "s.csv")
+    assert multitaper["metadata"]["windows"] == expected["metadata"]["windows"]
+    assert "Artifact" in multitaper["timeline"]
+    assert EEGProcessor(psd_method="multitaper").config() != EEGProcessor().config()
+    with pytest.raises(ValueError):
+        EEGProcessor(psd_method="periodogram")
@@ -0,0 +1,60 @@
+import pytest
+import numpy as np
+import pandas as pd
+import mne
+from EEG_Processor import EEGProcessor
+from EEG_Streaming import StreamingFilter
+
+
+CHANNELS = ['AF3', 'F7', 'F3', 'FC5', 'T7', 'P7', 'O1', 'O2', 'P8', 'T8', 'FC6', 'F4', 'F8', 'AF4']
+
+
+@pytest.fixture
+def processor():
+    return EEGProcessor()
+
+
+@pytest.fixture
+def eeg_csv(tmp_path):
+    """~2.5 min of 14 channel data in microvolts with a blink-like burst on a few channels."""
+    sfreq = 250
+    n = int(155 * sfreq)
+    rng = np.random.default_rng(42)
+    t = np.arange(n) / sfreq
+    data = rng.standard_normal((len(CHANNELS), n)) * 10
+    data += 20 * np.sin(2 * np.pi * 10 * t) * rng.uniform(0.5, 2, (len(CHANNELS), 1))
+    data[:6, 40 * sfreq:40 * sfreq + 300] += 800
+    df = pd.DataFrame(data.T, columns=CHANNELS)
+    df.insert(0, 'time', t)
+    df['label'] = 0
+    path = tmp_path / "session.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_streaming_filter_matches_mne():
+    """Filtering chunk by chunk should give the same signal as raw.filter on the full recording."""
+    x = np.random.default_rng(0).standard_normal((3, 250 * 20)) * 1e-5
+    raw = mne.io.RawArray(x.copy(), mne.create_info(3, 250, 'eeg'), verbose=False)
+    raw.filter(l_freq=0.5, h_freq=45.0, fir_design='firwin', verbose=False)
+
+    filt = StreamingFilter(250)
+    chunks = [filt.push(x[:, i:i + 777]) for i in range(0, x.shape[1], 777)]
+    chunks.append(filt.flush())
+    streamed = np.concatenate(chunks, axis=1)
+
+    assert streamed.shape == x.shape
+    assert np.allclose(streamed, raw.get_data(), rtol=0, atol=1e-15)
+
+
+@pytest.mark.parametrize("chunk_rows, window_size", [(1000, 30), (7500, 30), (1000, 5)])
+def test_streaming_matches_process_csv(eeg_csv, chunk_rows, window_size):
+    # 5s windows are shorter than n_fft, their PSD is one segment of the whole window
+    processor = EEGProcessor(window_size=window_size)
+    expected = processor.process_csv(eeg_csv)
+    result = processor.process_csv_streaming(eeg_csv, chunk_rows=chunk_rows)
+
+    assert result["timeline"] == expected["timeline"]
+    assert result["session_profile"] == expected["session_profile"]
+    assert result["metadata"] == expected["metadata"]
+    assert pd.DataFrame(result["scores"]).values == pytest.approx(pd.DataFrame(expected["scores"]).values)
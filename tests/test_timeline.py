@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from EEG_Timeline import lttb, minmax, result_view, timeline_segments
+
+METADATA = {"windows": 6, "window_size_sec": 30, "hop_sec": 10, "quality_warning": False}
+TIMELINE = ["Drowsy", "Drowsy", "Artifact", "Drowsy", "Drowsy", "Drowsy"]
+
+
+def test_timeline_segments_merge_runs():
+    assert timeline_segments(TIMELINE, METADATA) == [
+        {"state": "Drowsy", "start_sec": 0.0, "end_sec": 20.0, "windows": 2},
+        {"state": "Artifact", "start_sec": 20.0, "end_sec": 30.0, "windows": 1},
+        {"state": "Drowsy", "start_sec": 30.0, "end_sec": 80.0, "windows": 3},  # Last window ends at 50 + 30
+    ]
+    clipped = timeline_segments(TIMELINE, METADATA, start_sec=25, end_sec=40)
+    assert [(s["state"], s["start_sec"], s["end_sec"]) for s in clipped] == [("Artifact", 25, 30), ("Drowsy", 30, 40)]
+    assert timeline_segments([], METADATA) == []
+
+
+def test_downsampling_keeps_shape():
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 50.0  # A spike both methods must keep
+    for idx in (lttb(x, y, 200), minmax(y, 200)):
+        assert len(idx) <= 200
+        assert np.all(np.diff(idx) > 0)
+        assert 4321 in idx
+    assert lttb(x, y, 200)[0] == 0 and lttb(x, y, 200)[-1] == len(x) - 1
+    assert np.array_equal(lttb(x[:50], y[:50], 200), np.arange(50))
+
+
+def test_result_view_zoom_refines():
+    n = 21600
+    rng = np.random.default_rng(0)
+    result = {
+        "metadata": {"windows": n, "window_size_sec": 30, "hop_sec": 2, "quality_warning": False},
+        "timeline": np.repeat(["Drowsy", "High Focus"], n // 2).tolist(),
+        "scores": [{"focus_score": v} for v in rng.random(n)]
+    }
+    full = result_view(result, points=500)
+    assert full["downsampled"] and len(full["scores"]["focus_score"]["t"]) <= 500
+    assert [s["state"] for s in full["segments"]] == ["Drowsy", "High Focus"]
+    assert full["range"] == [0.0, (n - 1) * 2 + 30]
+
+    zoomed = result_view(result, start_sec=1000, end_sec=1400, points=500)
+    t = zoomed["scores"]["focus_score"]["t"]
+    # 200 windows start in range: every one of them is sent at full resolution
+    assert not zoomed["downsampled"] and t[0] <= 1000 and t[-1] >= 1400
+    assert zoomed["segments"] == [{"state": "Drowsy", "start_sec": 1000.0, "end_sec": 1400.0, "windows": n // 2}]
+    with pytest.raises(ValueError):
+        result_view(result, method="mean")